@@ -0,0 +1,112 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+
+from .cache import bump_counter, get_counter
+from .constants import (
+    AUTH_CACHE_ALIAS,
+    AUTH_TOKEN_CACHE_SIZE,
+    AUTH_TOKEN_CACHE_TTL
+)
+
+
+class TokenUserCache:
+    """
+    Пользователи по ключам токенов в памяти процесса: не дольше ttl
+    секунд и не больше max_size записей, первыми вытесняются давно
+    не использованные.
+
+    Каждая запись помнит версию токена из общего кэша, прочитанную до
+    запроса к базе. Удаление токена и сохранение пользователя после
+    фиксации транзакции увеличивают версию, и запись с прежней версией
+    не используется ни в одном процессе. Наружу отдаются копии, чтобы
+    изменения request.user в одном запросе не попадали в другие.
+    """
+
+    version_key = 'auth-token-version:{}'
+
+    def __init__(self, ttl=AUTH_TOKEN_CACHE_TTL,
+                 max_size=AUTH_TOKEN_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    @property
+    def cache(self):
+        return caches[AUTH_CACHE_ALIAS]
+
+    def get_version(self, key):
+        return get_counter(self.cache, self.version_key.format(key))
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, version, user, token = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+        if self.cache.get(self.version_key.format(key)) != version:
+            with self.lock:
+                self.entries.pop(key, None)
+            return None
+        user = copy.copy(user)
+        token = copy.copy(token)
+        token.user = user
+        return user, token
+
+    def set(self, key, version, user, token):
+        """version — версия токена, прочитанная до загрузки user."""
+        with self.lock:
+            self.entries[key] = (
+                time.monotonic() + self.ttl, version, copy.copy(user), token
+            )
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, keys):
+        """Сбрасывает токены во всех процессах после фиксации транзакции."""
+        keys = set(keys)
+        if keys:
+            transaction.on_commit(lambda: self._bump(keys))
+
+    def _bump(self, keys):
+        for key in keys:
+            bump_counter(self.cache, self.version_key.format(key))
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+token_users = TokenUserCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication без запроса к базе для недавних токенов:
+    вместо него одно чтение версии токена из общего кэша.
+    """
+
+    cache = token_users
+
+    def authenticate_credentials(self, key):
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        version = self.cache.get_version(key)
+        user, token = super().authenticate_credentials(key)
+        self.cache.set(key, version, user, token)
+        return user, token
@@ -0,0 +1,120 @@
+import logging
+import threading
+import time
+
+from django.db import DatabaseError, connection, transaction
+
+from recipe.models import ContentVersion
+from recipe.snapshot import reference_data
+
+from .constants import AUTOCOMPLETE_TTL, MAX_PAGE_SIZE
+from .stemmer import normalize
+
+logger = logging.getLogger(__name__)
+
+
+class Node:
+    __slots__ = ('children', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.top = []
+
+
+def build_trie(ingredients, max_results=MAX_PAGE_SIZE):
+    """
+    Префиксное дерево по нормализованным названиям. В каждом узле
+    хранятся готовые представления первых max_results ингредиентов
+    с этим префиксом: точное совпадение, затем более короткие названия.
+    """
+    root = Node()
+    keyed = sorted(
+        (len(key), key, item['id'], item)
+        for item in ingredients
+        for key in (normalize(item['name']),)
+    )
+    for _, key, _, item in keyed:
+        node = root
+        for char in key:
+            node = node.children.setdefault(char, Node())
+            if len(node.top) < max_results:
+                node.top.append(item)
+    return root
+
+
+class IngredientIndex:
+    """
+    Автодополнение ингредиентов из памяти процесса.
+
+    Дерево строится в фоновом потоке при первом запросе к процессу
+    и перестраивается после изменения ингредиентов; остальные процессы
+    сверяют версию справочника не чаще раза в ttl секунд, тоже в фоне.
+    Пока дерево не готово, search возвращает None, и вызывающий код
+    идёт в базу.
+    """
+
+    def __init__(self, ttl=AUTOCOMPLETE_TTL):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.root = None
+        self.version = None
+        self.checked_at = 0
+        self.building = False
+        self.pending = False
+
+    def search(self, prefix, limit):
+        root = self.root
+        if root is None:
+            self.warm()
+            return None
+        if time.monotonic() - self.checked_at > self.ttl:
+            self.schedule()
+        node = root
+        for char in normalize(prefix):
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.top[:limit]
+
+    def warm(self):
+        if self.root is None:
+            self.schedule()
+
+    def invalidate(self):
+        transaction.on_commit(lambda: self.schedule(force=True))
+
+    def schedule(self, force=False):
+        with self.lock:
+            if self.building:
+                self.pending = self.pending or force
+                return
+            self.building = True
+            self.checked_at = time.monotonic()
+        threading.Thread(
+            target=self.build, args=(force,), daemon=True
+        ).start()
+
+    def build(self, force):
+        try:
+            while True:
+                snapshot = reference_data.refresh()
+                version = snapshot.versions[ContentVersion.INGREDIENT]
+                if force or self.root is None or version != self.version:
+                    self.root = build_trie(snapshot.ingredients())
+                    self.version = version
+                self.checked_at = time.monotonic()
+                with self.lock:
+                    if not self.pending:
+                        self.building = False
+                        return
+                    self.pending = False
+                    force = True
+        except (DatabaseError, OSError):
+            logger.exception('Не удалось построить индекс ингредиентов')
+            with self.lock:
+                self.building = False
+        finally:
+            connection.close()
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,260 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from rest_framework import status
+from rest_framework.response import Response
+
+from .constants import (
+    RECIPE_CACHE_ALIAS,
+    SHOPPING_LIST_CACHE_ALIAS,
+    SHOPPING_LIST_MAX_CACHED_SIZE
+)
+
+
+def get_counter(cache, key):
+    """
+    Читает счётчик версии. Потерянный счётчик начинается заново с текущего
+    времени в наносекундах, поэтому не совпадает ни с одним из прежних.
+    """
+    value = cache.get(key)
+    if value is None:
+        value = time.time_ns()
+        if not cache.add(key, value, timeout=None):
+            value = cache.get(key, value)
+    return value
+
+
+def bump_counter(cache, key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+class RecipeFragmentCache:
+    """
+    Кэш не зависящей от пользователя части представления рецепта.
+
+    Ключ фрагмента включает версию рецепта; инвалидация увеличивает
+    версию, и старые фрагменты вытесняются бэкендом кэша (LRU).
+    """
+
+    version_key = 'recipe-version:{}'
+    fragment_key = 'recipe:{}:{}:{}'
+
+    @property
+    def cache(self):
+        return caches[RECIPE_CACHE_ALIAS]
+
+    def get_versions(self, recipe_ids):
+        keys = {self.version_key.format(pk): pk for pk in recipe_ids}
+        versions = {
+            keys[key]: version
+            for key, version in self.cache.get_many(keys).items()
+        }
+        for key, pk in keys.items():
+            if pk not in versions:
+                versions[pk] = get_counter(self.cache, key)
+        return versions
+
+    def get_many(self, recipe_ids, variant=''):
+        """
+        Возвращает найденные фрагменты и версии всех рецептов.
+        variant различает представления с разным набором полей.
+        """
+        versions = self.get_versions(recipe_ids)
+        keys = {
+            self.fragment_key.format(pk, version, variant): pk
+            for pk, version in versions.items()
+        }
+        fragments = {
+            keys[key]: fragment
+            for key, fragment in self.cache.get_many(keys).items()
+        }
+        return fragments, versions
+
+    def set(self, recipe_id, version, fragment, variant=''):
+        self.cache.set(
+            self.fragment_key.format(recipe_id, version, variant), fragment
+        )
+
+    def invalidate(self, recipe_ids):
+        """Сбрасывает фрагменты после фиксации текущей транзакции."""
+        recipe_ids = set(recipe_ids)
+        if recipe_ids:
+            transaction.on_commit(lambda: self._bump(recipe_ids))
+
+    def _bump(self, recipe_ids):
+        for pk in recipe_ids:
+            bump_counter(self.cache, self.version_key.format(pk))
+
+
+class ResponseCache:
+    """
+    Кэш ответов API для анонимных пользователей.
+
+    Ключ строится по адресу и нормализованному набору параметров запроса
+    и включает общее поколение, которое увеличивается при любой записи
+    рецептов, тегов и ингредиентов, так что устаревшие страницы
+    никогда не отдаются.
+    """
+
+    generation_key = 'responses-generation'
+    response_key = 'response:{}:{}'
+    stats_key = 'responses-{}'
+
+    @property
+    def cache(self):
+        return caches[RECIPE_CACHE_ALIAS]
+
+    def make_key(self, request):
+        params = sorted(
+            (name, sorted(value for value in values if value))
+            for name, values in request.query_params.lists()
+        )
+        query = urlencode(
+            [(name, value) for name, values in params for value in values]
+        )
+        url = f'{request.build_absolute_uri(request.path)}?{query}'
+        generation = get_counter(self.cache, self.generation_key)
+        return self.response_key.format(
+            generation, hashlib.md5(url.encode()).hexdigest()
+        )
+
+    def get(self, key):
+        data = self.cache.get(key)
+        self.count('hits' if data is not None else 'misses')
+        return data
+
+    def set(self, key, data):
+        self.cache.set(key, data)
+
+    def count(self, name):
+        key = self.stats_key.format(name)
+        if not self.cache.add(key, 1, timeout=None):
+            try:
+                self.cache.incr(key)
+            except ValueError:
+                pass
+
+    def stats(self):
+        """Попадания и промахи; читает команда response_cache_stats."""
+        keys = {
+            self.stats_key.format(name): name for name in ('hits', 'misses')
+        }
+        found = self.cache.get_many(keys)
+        return {name: found.get(key, 0) for key, name in keys.items()}
+
+    def reset_stats(self):
+        self.cache.delete_many([
+            self.stats_key.format(name) for name in ('hits', 'misses')
+        ])
+
+    def invalidate(self):
+        """Сбрасывает все ответы после фиксации текущей транзакции."""
+        transaction.on_commit(
+            lambda: bump_counter(self.cache, self.generation_key)
+        )
+
+
+class ShoppingListCache:
+    """
+    Готовые списки покупок по ключу (пользователь, версия корзины, формат).
+
+    Версия корзины увеличивается при добавлении и удалении рецептов
+    и при изменении рецепта из корзины. Число документов ограничено
+    MAX_ENTRIES бэкенда (LRU), а слишком большие документы не кэшируются,
+    так что объём кэша ограничен сверху.
+    """
+
+    version_key = 'shopping-list-version:{}'
+    document_key = 'shopping-list:{}:{}:{}'
+    max_size = SHOPPING_LIST_MAX_CACHED_SIZE
+
+    @property
+    def cache(self):
+        return caches[SHOPPING_LIST_CACHE_ALIAS]
+
+    def make_key(self, user_id, format):
+        version = get_counter(self.cache, self.version_key.format(user_id))
+        return self.document_key.format(user_id, version, format)
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, content):
+        if len(content) <= self.max_size:
+            self.cache.set(key, content)
+
+    def cache_stream(self, key, chunks):
+        """
+        Отдаёт части потокового документа и сохраняет его целиком,
+        если он уложился в max_size; больший документ не накапливается.
+        """
+        parts, size = [], 0
+        for chunk in chunks:
+            if parts is not None:
+                size += len(chunk)
+                if size <= self.max_size:
+                    parts.append(chunk)
+                else:
+                    parts = None
+            yield chunk
+        if parts is not None:
+            self.cache.set(key, ''.join(parts))
+
+    def invalidate(self, user_ids):
+        """Сбрасывает списки покупок после фиксации транзакции."""
+        user_ids = set(user_ids)
+        if user_ids:
+            transaction.on_commit(lambda: self._bump(user_ids))
+
+    def _bump(self, user_ids):
+        for user_id in user_ids:
+            bump_counter(self.cache, self.version_key.format(user_id))
+
+
+recipe_fragments = RecipeFragmentCache()
+recipe_responses = ResponseCache()
+shopping_lists = ShoppingListCache()
+
+
+class AnonymousResponseCacheMixin:
+    """Отдаёт анонимным пользователям list и retrieve из кэша ответов."""
+
+    response_cache = recipe_responses
+    cached_headers = ('ETag', 'Last-Modified', 'Vary')
+
+    def list(self, request, *args, **kwargs):
+        return self.cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached(super().retrieve, request, *args, **kwargs)
+
+    def cached(self, view, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+        key = self.response_cache.make_key(request)
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            data, headers = cached
+            response = get_conditional_response(
+                request, etag=headers.get('ETag')
+            ) or Response(data)
+            for name, value in headers.items():
+                response[name] = value
+            response['X-Cache'] = 'HIT'
+            return response
+        response = view(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            headers = {
+                name: response[name] for name in self.cached_headers
+                if response.has_header(name)
+            }
+            self.response_cache.set(key, (response.data, headers))
+        response['X-Cache'] = 'MISS'
+        return response
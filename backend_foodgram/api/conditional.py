@@ -0,0 +1,123 @@
+import hashlib
+
+from django.db.models import F
+from django.utils.cache import (
+    get_conditional_response,
+    patch_vary_headers,
+    quote_etag
+)
+from django.utils.http import http_date
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from recipe.snapshot import reference_data
+
+
+class ConditionalGetMixin:
+    """
+    Строгие ETag и Last-Modified для list и retrieve.
+
+    ETag строится по версиям справочников, от которых зависит ответ,
+    и по состоянию объектов страницы, поэтому на актуальную копию клиента
+    вьюсет отвечает 304 Not Modified, не сериализуя тело.
+    Без last_modified_field ответ зависит только от справочников:
+    список получает 304 ещё до запроса к самой таблице, а для
+    отдельного объекта сначала проверяется, что он существует.
+    Last-Modified отдаётся только в этом случае: дата изменения объектов
+    не учитывает удалённые строки и отметки пользователя.
+    """
+
+    content_versions = ()
+    last_modified_field = None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if (self.last_modified_field is None
+                or self.request.method not in SAFE_METHODS):
+            return queryset
+        return queryset.annotate(last_modified=F(self.last_modified_field))
+
+    def get_object_state(self, obj):
+        return (obj.pk, obj.last_modified)
+
+    def get_validators(self, objects=(), extra=None):
+        snapshot = reference_data.get()
+        versions = [
+            snapshot.versions[name] for name in sorted(self.content_versions)
+        ]
+        states = [self.get_object_state(obj) for obj in objects]
+        parts = (
+            self.request.build_absolute_uri(),
+            self.request.user.pk,
+            self.request.accepted_renderer.format,
+            versions,
+            states,
+            extra,
+        )
+        etag = quote_etag(hashlib.md5(repr(parts).encode()).hexdigest())
+        if self.last_modified_field is not None:
+            return etag, None
+        modified = [updated_at for _, updated_at in versions if updated_at]
+        last_modified = (
+            int(max(modified).timestamp()) if modified else None
+        )
+        return etag, last_modified
+
+    def get_not_modified(self, validators):
+        etag, last_modified = validators
+        response = get_conditional_response(
+            self.request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            self.set_validators(response, validators)
+        return response
+
+    def set_validators(self, response, validators):
+        etag, last_modified = validators
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        if self.last_modified_field is None:
+            validators = self.get_validators()
+            return self.get_not_modified(validators) or self.set_validators(
+                super().list(request, *args, **kwargs), validators
+            )
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            objects, pagination = list(queryset), None
+        else:
+            objects = page
+            pagination = self.paginator.get_paginated_response([]).data
+        validators = self.get_validators(objects, pagination)
+        not_modified = self.get_not_modified(validators)
+        if not_modified is not None:
+            return not_modified
+        serializer = self.get_serializer(objects, many=True)
+        if page is None:
+            response = Response(serializer.data)
+        else:
+            response = self.get_paginated_response(serializer.data)
+        return self.set_validators(response, validators)
+
+    def retrieve(self, request, *args, **kwargs):
+        if self.last_modified_field is None:
+            # Объект ищется до сверки валидаторов: версии справочника
+            # одинаковы для всех id, и без этого на несуществующий id
+            # пришёл бы 304 вместо 404.
+            response = super().retrieve(request, *args, **kwargs)
+            validators = self.get_validators()
+            return self.get_not_modified(validators) or self.set_validators(
+                response, validators
+            )
+        instance = self.get_object()
+        validators = self.get_validators((instance,))
+        not_modified = self.get_not_modified(validators)
+        if not_modified is not None:
+            return not_modified
+        serializer = self.get_serializer(instance)
+        return self.set_validators(Response(serializer.data), validators)
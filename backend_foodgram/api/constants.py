@@ -22,3 +22,59 @@ PAGE_SIZE = 20
 MAX_PAGE_SIZE = 50
 BAD_INGREDIENT_LENGTH = 0
 HASH_LENGTH = 12
+RECIPE_CACHE_ALIAS = 'recipes'
+RECIPE_CACHE_MAX_ENTRIES = 5000
+RECIPE_CACHE_TIMEOUT = 60 * 60 * 24
+AUTHOR_FIELDS = frozenset(
+    ('username', 'email', 'first_name', 'last_name', 'avatar')
+)
+COUNTER_CHUNK_SIZE = 1000
+REFERENCE_SNAPSHOT_TTL = 5
+SEARCH_CONFIG = 'russian'
+SEARCH_CHUNK_SIZE = 500
+# Сколько лучших рецептов отдаёт поиск по индексу в памяти.
+SEARCH_MEMORY_LIMIT = 500
+# Веса полей во встроенном индексе, как веса A/B/C ts_rank по умолчанию.
+SEARCH_WEIGHTS = {'name': 1.0, 'tags': 0.4, 'ingredients': 0.4, 'text': 0.2}
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_TTL = 60
+INGREDIENT_BATCH_SIZE = 1000
+SHOPPING_LIST_CACHE_ALIAS = 'shopping-lists'
+SHOPPING_LIST_CACHE_MAX_ENTRIES = 500
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60 * 24
+SHOPPING_LIST_MAX_CACHED_SIZE = 1024 * 1024
+SHOPPING_LIST_CONTENT_TYPES = {
+    'pdf': 'application/pdf',
+    'txt': 'text/plain; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+    'json': 'application/json',
+}
+# Списки PDF длиннее этого числа строк формируются в фоне.
+SHOPPING_LIST_ASYNC_LINES = 300
+SHOPPING_LIST_WORKERS = 2
+SHOPPING_LIST_JOB_TIMEOUT = 10 * 60
+SHOPPING_LIST_PROGRESS_STEP = 100
+UUID_PATTERN = '[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'
+FAVORITE_EXISTS = 'Вы уже добавляли это рецепт в избранное'
+SHOPPING_CART_EXISTS = 'Вы уже добавляли это рецепт в список покупок'
+SUBSCRIPTION_EXISTS = 'Вы уже подписывались на этого автора'
+SELF_SUBSCRIPTION = 'Подписка на cамого себя не имеет смысла'
+NOTHING_TO_DELETE = 'нельзя удалить то чего нет'
+REFERENCE_DELETED = (
+    'Тег или ингредиент был удалён, обновите данные и повторите запрос'
+)
+RECIPE_BATCH_LIMIT = 100
+SHORT_LINK_CHECKSUM_LENGTH = 3
+SHORT_LINK_CACHE_SIZE = 4096
+LINK_CLICKS_FLUSH_INTERVAL = 30
+LINK_CLICKS_BATCH_SIZE = 500
+# Предел recipes_limit в подписках и значение по умолчанию.
+SUBSCRIPTION_RECIPES_LIMIT = 50
+# Рецепты авторов с таким числом подписчиков не раскладываются по лентам,
+# а подмешиваются при чтении.
+FEED_PUSH_FOLLOWERS_LIMIT = 1000
+# Сколько последних рецептов автора попадает в ленту при подписке.
+FEED_BACKFILL_SIZE = 100
+AUTH_CACHE_ALIAS = 'auth'
+AUTH_TOKEN_CACHE_TTL = 30
+AUTH_TOKEN_CACHE_SIZE = 10000
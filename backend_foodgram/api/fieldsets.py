@@ -0,0 +1,106 @@
+import hashlib
+
+from django.conf import settings
+from rest_framework.fields import BooleanField
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.serializers import ListSerializer
+
+
+def parse_fieldset(value):
+    """
+    Разбирает строку вида «id,name,author.first_name» в дерево
+    {'id': {}, 'name': {}, 'author': {'first_name': {}}}.
+    """
+    if not value:
+        return None
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for name in filter(None, path.strip().split('.')):
+            node = node.setdefault(name, {})
+    return tree or None
+
+
+class SparseFieldsetMixin:
+    """
+    Оставляет в сериализаторе только запрошенные поля.
+
+    Корневой сериализатор берёт деревья fields и omit из контекста,
+    вложенные получают свои поддеревья от родителя.
+    """
+
+    selection = None
+
+    def is_root(self):
+        parent = self.parent
+        if isinstance(parent, ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_selection(self):
+        if self.selection is not None:
+            return self.selection
+        if self.is_root():
+            return self.context.get('fields'), self.context.get('omit')
+        return None, None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        only, omit = self.get_selection()
+        for name in list(fields):
+            if only is not None and name not in only:
+                del fields[name]
+            elif omit is not None and omit.get(name) == {}:
+                del fields[name]
+        for name, field in fields.items():
+            nested = getattr(field, 'child', field)
+            if isinstance(nested, SparseFieldsetMixin):
+                nested.selection = (
+                    (only or {}).get(name) or None,
+                    (omit or {}).get(name) or None,
+                )
+        return fields
+
+    @property
+    def fieldset_signature(self):
+        """Короткий отпечаток набора полей для ключей кэша."""
+        return hashlib.md5(describe_fields(self).encode()).hexdigest()[:8]
+
+
+def describe_fields(serializer):
+    if isinstance(serializer, ListSerializer):
+        serializer = serializer.child
+    parts = []
+    for name, field in serializer.fields.items():
+        if hasattr(field, 'fields') or hasattr(field, 'child'):
+            parts.append(f'{name}({describe_fields(field)})')
+        else:
+            parts.append(name)
+    return ','.join(parts)
+
+
+class SparseFieldsetViewMixin:
+    """
+    Передаёт сериализатору ?fields= и ?omit=. Для списков, если клиент
+    не выбрал поля сам, может использоваться компактный набор
+    Meta.compact_fields (?compact=true или настройка COMPACT_LISTS).
+    """
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request is None or self.request.method not in SAFE_METHODS:
+            return context
+        params = self.request.query_params
+        fields = params.get('fields')
+        if not fields and self.action == 'list' and self.is_compact():
+            meta = getattr(self.get_serializer_class(), 'Meta', None)
+            fields = getattr(meta, 'compact_fields', None)
+        context['fields'] = parse_fieldset(fields)
+        context['omit'] = parse_fieldset(params.get('omit'))
+        return context
+
+    def is_compact(self):
+        value = self.request.query_params.get('compact')
+        if value is None:
+            return settings.COMPACT_LISTS
+        return value.lower() in BooleanField.TRUE_VALUES
@@ -1,6 +1,9 @@
+from django import forms
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as filters
 
 from recipe.models import Ingredient, Recipe
+from recipe.registry import tag_registry
 
 
 class IngredientSearchFilter(filters.FilterSet):
@@ -11,9 +14,39 @@ class IngredientSearchFilter(filters.FilterSet):
         fields = ('name', )
 
 
+def tag_choices():
+    return tag_registry.choices()
+
+
+class TagSlugField(forms.MultipleChoiceField):
+    """Проверяет slug по реестру тегов, без запроса к базе."""
+
+    def valid_value(self, value):
+        return tag_registry.get_id(value) is not None
+
+
+class TagFilter(filters.MultipleChoiceFilter):
+    """
+    Рецепты хотя бы с одним из тегов: EXISTS по таблице связи
+    вместо JOIN, поэтому рецепты не дублируются и DISTINCT не нужен.
+    """
+
+    field_class = TagSlugField
+
+    def filter(self, queryset, value):
+        if not value:
+            return queryset
+        return queryset.filter(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe=OuterRef('pk'),
+                tag_id__in=tag_registry.get_ids(value)
+            )
+        ))
+
+
 class RecipeFilter(filters.FilterSet):
     name = filters.CharFilter(field_name='name', lookup_expr='startswith')
-    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+    tags = TagFilter(choices=tag_choices)
     is_favorited = filters.BooleanFilter(method='get_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_is_in_shopping_cart')
@@ -0,0 +1,139 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from recipe.models import ShoppingListJob
+
+from .constants import (
+    SHOPPING_LIST_JOB_TIMEOUT,
+    SHOPPING_LIST_PROGRESS_STEP,
+    SHOPPING_LIST_WORKERS
+)
+from .pdf import shopping_list_pdf
+from .utils import get_ingredients_cart, shopping_list_line
+
+logger = logging.getLogger(__name__)
+
+
+class ShoppingListJobs:
+    """
+    Фоновое формирование больших списков покупок.
+
+    PDF строится в пуле потоков процесса, так что воркер сразу
+    освобождается. Состояние задач хранится в базе, поэтому о ходе
+    работы отвечает любой воркер, а готовый файл отдаёт nginx.
+    """
+
+    def __init__(self, workers=SHOPPING_LIST_WORKERS):
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.executor = None
+
+    def get_executor(self):
+        # Пул создаётся при первой задаче, уже в процессе воркера.
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(
+                    self.workers, thread_name_prefix='shopping-list'
+                )
+            return self.executor
+
+    def get_root(self):
+        return Path(settings.SHOPPING_LIST_ROOT)
+
+    def get_path(self, job):
+        return self.get_root() / job.file_name
+
+    def start(self, user, format, key, lines):
+        """
+        Возвращает задачу для текущей версии корзины: готовую или ещё
+        выполняемую, а если такой нет — ставит новую в очередь.
+        """
+        jobs = ShoppingListJob.objects.filter(user=user, format=format)
+        job = jobs.filter(cache_key=key).filter(
+            Q(status=ShoppingListJob.Status.DONE)
+            | Q(
+                status__in=(
+                    ShoppingListJob.Status.PENDING,
+                    ShoppingListJob.Status.RUNNING
+                ),
+                created_at__gte=timezone.now() - timedelta(
+                    seconds=SHOPPING_LIST_JOB_TIMEOUT
+                )
+            )
+        ).first()
+        if job is not None:
+            return job
+        self.remove(jobs)
+        job = ShoppingListJob.objects.create(
+            user=user, format=format, cache_key=key, lines=lines
+        )
+        transaction.on_commit(
+            lambda: self.get_executor().submit(self.run, job.pk)
+        )
+        return job
+
+    def remove(self, jobs):
+        """Удаляет устаревшие задачи вместе с файлами."""
+        for file_name in jobs.exclude(file_name='').values_list(
+            'file_name', flat=True
+        ):
+            (self.get_root() / file_name).unlink(missing_ok=True)
+        jobs.delete()
+
+    def track(self, job, ingredients_cart):
+        jobs = ShoppingListJob.objects.filter(pk=job.pk)
+        for number, ingredient in enumerate(ingredients_cart, start=1):
+            if number % SHOPPING_LIST_PROGRESS_STEP == 0 and job.lines:
+                jobs.update(progress=min(99, number * 100 // job.lines))
+            yield shopping_list_line(number, ingredient)
+
+    def run(self, job_id):
+        jobs = ShoppingListJob.objects.filter(pk=job_id)
+        temporary = None
+        try:
+            job = jobs.first()
+            if job is None:
+                return
+            jobs.update(status=ShoppingListJob.Status.RUNNING)
+            root = self.get_root()
+            root.mkdir(parents=True, exist_ok=True)
+            file_name = f'{job.pk}.{job.format}'
+            temporary = root / f'{file_name}.tmp'
+            with open(temporary, 'wb') as output:
+                shopping_list_pdf.render(
+                    self.track(
+                        job, get_ingredients_cart(job.user_id).iterator()
+                    ),
+                    output
+                )
+            os.replace(temporary, root / file_name)
+            if not jobs.update(
+                status=ShoppingListJob.Status.DONE,
+                progress=100,
+                file_name=file_name,
+                finished_at=timezone.now()
+            ):
+                # Задачу удалили, пока файл формировался.
+                (root / file_name).unlink(missing_ok=True)
+        except Exception:
+            logger.exception('Не удалось сформировать список покупок')
+            if temporary is not None:
+                temporary.unlink(missing_ok=True)
+            jobs.update(
+                status=ShoppingListJob.Status.FAILED,
+                finished_at=timezone.now()
+            )
+        finally:
+            connection.close()
+
+
+shopping_list_jobs = ShoppingListJobs()
@@ -0,0 +1,89 @@
+import io
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from api.utils import create_shopping_cart
+
+
+def legacy_shopping_cart(ingredients_cart):
+    """Прежняя реализация: шрифт на каждый вызов, BytesIO и копия."""
+    response = HttpResponse(content_type='application/pdf')
+    font_file = Path(__file__).resolve().parents[2] / 'data' / 'arial.ttf'
+    pdfmetrics.registerFont(TTFont('Arial', font_file, 'UTF-8'))
+    buffer = io.BytesIO()
+    pdf_file = canvas.Canvas(buffer)
+    pdf_file.setFont('Arial', 20)
+    pdf_file.drawString(200, 800, 'Список покупок.')
+    pdf_file.setFont('Arial', 14)
+    from_bottom = 750
+    for number, ingredient in enumerate(ingredients_cart, start=1):
+        pdf_file.drawString(
+            50,
+            from_bottom,
+            f"{number}. {ingredient['ingredient__name']}: "
+            f"{ingredient['ingredient_value']} "
+            f"{ingredient['ingredient__measurement_unit']}.",
+        )
+        from_bottom -= 20
+        if from_bottom <= 50:
+            from_bottom = 800
+            pdf_file.showPage()
+            pdf_file.setFont('Arial', 14)
+    pdf_file.showPage()
+    pdf_file.save()
+    pdf = buffer.getvalue()
+    buffer.close()
+    response.write(pdf)
+    return response
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время и пиковую память формирования PDF со списком '
+        'покупок для прежней и текущей реализации.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, nargs='+',
+                            default=(10, 1000, 10000))
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, lines, repeat, **options):
+        self.stdout.write(
+            f'{"строк":>7} {"реализация":>10} {"мс":>9} {"пик, КБ":>9} '
+            f'{"PDF, КБ":>9}'
+        )
+        for count in lines:
+            cart = [
+                {
+                    'ingredient__name': f'ингредиент {number}',
+                    'ingredient__measurement_unit': 'г',
+                    'ingredient_value': number,
+                }
+                for number in range(count)
+            ]
+            for name, render in (('прежняя', legacy_shopping_cart),
+                                 ('текущая', create_shopping_cart)):
+                timings = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    render(cart)
+                    timings.append((time.perf_counter() - started) * 1000)
+                tracemalloc.start()
+                response = render(cart)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                self.stdout.write(
+                    f'{count:>7} {name:>10} '
+                    f'{statistics.median(timings):>9.1f} '
+                    f'{peak / 1024:>9.0f} '
+                    f'{len(response.content) / 1024:>9.0f}'
+                )
@@ -0,0 +1,107 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.http import QueryDict
+from django_filters import rest_framework as filters
+
+from api.constants import PAGE_SIZE
+from api.filters import RecipeFilter
+from recipe.models import ContentVersion, Recipe, Tag
+from recipe.snapshot import reference_data
+from user.models import User
+
+
+class LegacyRecipeFilter(filters.FilterSet):
+    """Прежний фильтр по тегам: DISTINCT-выборка slug и JOIN по связи."""
+
+    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+
+    class Meta:
+        model = Recipe
+        fields = ('tags',)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время фильтрации рецептов по тегам для прежнего '
+        'и текущего фильтра на синтетических данных. Данные создаются '
+        'в транзакции, которая затем откатывается.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, nargs='+',
+                            default=(1000, 10000))
+        parser.add_argument('--tags', type=int, nargs='+',
+                            default=(10, 100, 1000))
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"рецептов":>9} {"тегов":>6} {"прежний, мс":>12} '
+            f'{"текущий, мс":>12}'
+        )
+        for recipes in options['recipes']:
+            for tags in options['tags']:
+                with transaction.atomic():
+                    slugs = self.create_data(
+                        recipes, tags, options['tags_per_recipe']
+                    )
+                    timings = [
+                        self.measure(filterset, slugs, options['repeat'])
+                        for filterset in (LegacyRecipeFilter, RecipeFilter)
+                    ]
+                    transaction.set_rollback(True)
+                reference_data.expire()
+                self.stdout.write(
+                    f'{recipes:>9} {tags:>6} {timings[0]:>12.2f} '
+                    f'{timings[1]:>12.2f}'
+                )
+
+    def create_data(self, recipes, tags, tags_per_recipe):
+        author = User.objects.create(
+            username='benchmark-tag-filter', email='benchmark@foodgram.local'
+        )
+        Tag.objects.bulk_create(
+            Tag(name=f'bench-{index}', slug=f'bench-{index}')
+            for index in range(tags)
+        )
+        Recipe.objects.bulk_create(
+            Recipe(author=author, name=f'bench-{index}', text='bench',
+                   description='bench', cooking_time=1,
+                   image='recipe/images/bench.png')
+            for index in range(recipes)
+        )
+        tag_ids = list(
+            Tag.objects.filter(slug__startswith='bench-')
+            .order_by('pk').values_list('pk', flat=True)
+        )
+        recipe_ids = author.recipes.values_list('pk', flat=True)
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(
+                recipe_id=recipe_id,
+                tag_id=tag_ids[(index + shift) % len(tag_ids)]
+            )
+            for index, recipe_id in enumerate(recipe_ids)
+            for shift in range(min(tags_per_recipe, len(tag_ids)))
+        )
+        ContentVersion.bump(ContentVersion.TAG)
+        reference_data.expire()
+        return ['bench-0', 'bench-1']
+
+    def measure(self, filterset_class, slugs, repeat):
+        data = QueryDict(mutable=True)
+        data.setlist('tags', slugs)
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            filterset = filterset_class(data, queryset=Recipe.objects.all())
+            if not filterset.is_valid():
+                raise CommandError(filterset.errors.as_text())
+            queryset = filterset.qs
+            queryset.count()
+            list(queryset[:PAGE_SIZE])
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
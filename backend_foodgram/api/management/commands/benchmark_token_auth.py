@@ -0,0 +1,63 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.authentication import CachedTokenAuthentication, token_users
+from user.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает число запросов к базе и время аутентификации '
+        'по токену для TokenAuthentication и CachedTokenAuthentication. '
+        'Пользователь и токен создаются в транзакции, которая затем '
+        'откатывается.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"класс":<28} {"запросов к БД":>14} {"мкс на запрос":>14}'
+        )
+        with transaction.atomic():
+            user = User.objects.create(
+                username='benchmark-token-auth',
+                email='benchmark-token-auth@foodgram.local'
+            )
+            token = Token.objects.create(user=user)
+            for authentication in (
+                TokenAuthentication(), CachedTokenAuthentication()
+            ):
+                queries, timing = self.measure(
+                    authentication, token.key, options['requests']
+                )
+                self.stdout.write(
+                    f'{type(authentication).__name__:<28} '
+                    f'{queries:>14.2f} {timing:>14.1f}'
+                )
+            transaction.set_rollback(True)
+        token_users.clear()
+
+    def measure(self, authentication, key, requests):
+        factory = APIRequestFactory()
+        timings = []
+        with CaptureQueriesContext(connection) as context:
+            for _ in range(requests):
+                request = Request(factory.get(
+                    '/api/users/me/', HTTP_AUTHORIZATION=f'Token {key}'
+                ))
+                started = time.perf_counter()
+                authentication.authenticate(request)
+                timings.append((time.perf_counter() - started) * 1000000)
+        return len(context.captured_queries) / requests, statistics.median(
+            timings
+        )
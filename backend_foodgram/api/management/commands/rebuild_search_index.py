@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from api.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс рецептов.'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        backend.rebuild()
+        self.stdout.write(f'Индекс перестроен: {type(backend).__name__}')
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import recipe_responses
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает число попаданий и промахов кэша ответов '
+        'для анонимных пользователей.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Обнулить счётчики после вывода.'
+        )
+
+    def handle(self, *args, **options):
+        stats = recipe_responses.stats()
+        total = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / total * 100 if total else 0
+        self.stdout.write(
+            f'попаданий: {stats["hits"]}, промахов: {stats["misses"]}, '
+            f'доля попаданий: {ratio:.1f}%'
+        )
+        if options['reset']:
+            recipe_responses.reset_stats()
@@ -0,0 +1,155 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F, Prefetch, Window
+from django.db.models.functions import RowNumber
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+
+def get_model_field(model, name):
+    """Ищет поле модели по имени, в том числе по имени обратной связи."""
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        pass
+    for relation in model._meta.related_objects:
+        if relation.get_accessor_name() == name:
+            return relation
+    return None
+
+
+class QueryPlan:
+    """
+    План выборки, построенный по дереву полей сериализатора:
+    какие связи подтянуть через JOIN, какие отдельным запросом
+    и какие колонки читать из базы.
+    """
+
+    def __init__(self):
+        self.only = set()
+        self.select_related = set()
+        self.prefetch_related = {}
+
+    def collect(self, serializer, model, prefix=''):
+        if isinstance(serializer, ListSerializer):
+            serializer = serializer.child
+        for field in serializer.fields.values():
+            if field.write_only:
+                continue
+            if field.source == '*':
+                if isinstance(field, BaseSerializer):
+                    self.collect(field, model, prefix)
+                continue
+            self.add_source(field, model, prefix, field.source_attrs)
+        related_serializers = getattr(
+            getattr(serializer, 'Meta', None), 'related_serializers', {}
+        )
+        for source, serializer_class in related_serializers.items():
+            self.add_source(
+                serializer_class(many=True), model, prefix, source.split('.')
+            )
+
+    def add_source(self, field, model, prefix, attrs):
+        attr, rest = attrs[0], attrs[1:]
+        model_field = get_model_field(model, attr)
+        if model_field is None:
+            # Свойство, метод модели или аннотация.
+            return
+        path = prefix + getattr(model_field, 'name', attr)
+        if not model_field.concrete:
+            path = prefix + attr
+        if not model_field.is_relation:
+            self.only.add(path)
+            return
+        if attr == getattr(model_field, 'attname', None) != model_field.name:
+            self.only.add(path)
+            return
+        nested = None
+        if isinstance(field, BaseSerializer) and not rest:
+            nested = field
+        related_model = model_field.related_model
+        if model_field.many_to_many or model_field.one_to_many:
+            child = QueryPlan()
+            if nested is not None:
+                child.collect(nested, related_model)
+            elif rest:
+                child.add_source(field, related_model, '', rest)
+            if model_field.one_to_many:
+                child.only.add(model_field.field.name)
+            queryset = child.apply(related_model._default_manager.all())
+            self.prefetch_related[path] = Prefetch(path, queryset=queryset)
+            return
+        if model_field.concrete:
+            self.only.add(path)
+        if nested is None and not rest:
+            return
+        self.select_related.add(path)
+        if nested is not None:
+            self.collect(nested, related_model, f'{path}__')
+        else:
+            self.add_source(field, related_model, f'{path}__', rest)
+
+    def apply(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(
+                *self.prefetch_related.values()
+            )
+        if self.only:
+            queryset = queryset.only(*sorted(self.only))
+        return queryset
+
+
+def optimize_queryset(queryset, serializer):
+    """
+    Подгружает связи и ограничивает колонки выборки
+    полями, которые выводит сериализатор.
+    """
+    if isinstance(serializer, type):
+        serializer = serializer()
+    plan = QueryPlan()
+    plan.collect(serializer, queryset.model)
+    return plan.apply(queryset)
+
+
+class OptimizedQuerysetMixin:
+    """Оптимизирует queryset вьюсета под сериализатор ответа."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method not in SAFE_METHODS:
+            return queryset
+        return optimize_queryset(queryset, self.get_serializer())
+
+
+def prefetch_recent(objects, queryset, field, limit, to_attr):
+    """
+    Подгружает каждому объекту первые limit связанных строк
+    одним запросом с ROW_NUMBER() по field и кладёт их списком
+    в атрибут to_attr. Порядок — ordering queryset.
+    """
+    by_pk = {obj.pk: obj for obj in objects}
+    for obj in by_pk.values():
+        setattr(obj, to_attr, [])
+    if not by_pk or limit <= 0:
+        return
+    model = queryset.model
+    ordering = queryset.query.order_by or model._meta.ordering
+    ranked = queryset.filter(**{f'{field}__in': by_pk}).annotate(
+        prefetch_key=F(field),
+        row_number=Window(
+            RowNumber(),
+            partition_by=F(field),
+            order_by=[
+                F(name[1:]).desc() if name.startswith('-') else F(name).asc()
+                for name in (*ordering, '-pk')
+            ]
+        )
+    ).order_by()
+    sql, params = ranked.query.sql_with_params()
+    for row in model._default_manager.raw(
+        f'SELECT * FROM ({sql}) ranked WHERE ranked.row_number <= %s '
+        'ORDER BY ranked.row_number',
+        (*params, limit)
+    ):
+        getattr(by_pk[row.prefetch_key], to_attr).append(row)
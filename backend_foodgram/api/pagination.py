@@ -1,10 +1,197 @@
-from rest_framework.pagination import PageNumberPagination
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from operator import attrgetter
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 from .constants import MAX_PAGE_SIZE, PAGE_SIZE
 
 
-class CustomPageNumberPagination(PageNumberPagination):
+class KeysetPagination(BasePagination):
+    """
+    Пагинация по ключу сортировки: страница выбирается условием
+    «после последней записи предыдущей страницы», без COUNT(*) и OFFSET,
+    поэтому любая страница стоит столько же, сколько первая.
+    """
+
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+    ordering_conflict_message = (
+        'Курсор нельзя сочетать с другой сортировкой (ordering, search).'
+    )
+    ordering = ('-pub_date', '-id')
+    page_size = PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.paginate_querysets(
+            ((queryset, self.ordering),), request, view
+        )
+
+    def paginate_querysets(self, sources, request, view=None):
+        """
+        Страница из нескольких одинаково упорядоченных источников:
+        пар (queryset, его поля, соответствующие ordering). Каждый
+        источник читается своим запросом с тем же условием и LIMIT,
+        страница собирается слиянием; курсор общий.
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.model = sources[0][0].model
+        if any(queryset.query.order_by for queryset, _ in sources):
+            # Страницы по курсору идут только в порядке ordering;
+            # молча подменять выбранную клиентом сортировку нельзя.
+            raise ValidationError(
+                {self.cursor_query_param: [self.ordering_conflict_message]}
+            )
+        page_size = self.get_page_size(request)
+        position, self.reverse = self.decode_cursor(request)
+        page = []
+        for queryset, ordering in sources:
+            if self.reverse:
+                ordering = tuple(invert(field) for field in ordering)
+            queryset = queryset.annotate(**{
+                key_name(key): F(field.lstrip('-'))
+                for key, field in zip(self.ordering, ordering)
+            }).order_by(*ordering)
+            if position is not None:
+                queryset = queryset.filter(after_position(ordering, position))
+            page += queryset[:page_size + 1]
+        if len(sources) > 1:
+            self.sort(page)
+        page = page[:page_size + 1]
+        self.has_more = len(page) > page_size
+        self.has_position = position is not None
+        self.page = page[:page_size]
+        if self.reverse:
+            self.page.reverse()
+        return self.page
+
+    def sort(self, page):
+        # Устойчивые сортировки от младшего ключа к старшему.
+        for field in reversed(self.ordering):
+            page.sort(
+                key=attrgetter(key_name(field)),
+                reverse=field.startswith('-') != self.reverse
+            )
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size or page_size)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict((
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        )))
+
+    def get_next_link(self):
+        has_next = self.has_position if self.reverse else self.has_more
+        if not self.page or not has_next:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        has_previous = self.has_more if self.reverse else self.has_position
+        if not self.page or not has_previous:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, instance, reverse):
+        position = []
+        for field in self.ordering:
+            value = getattr(instance, key_name(field))
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            position.append(value)
+        token = json.dumps({'p': position, 'r': int(reverse)})
+        cursor = urlsafe_b64encode(token.encode()).decode()
+        url = remove_query_param(self.base_url, 'page')
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            token = json.loads(urlsafe_b64decode(cursor.encode()))
+            if len(token['p']) != len(self.ordering):
+                raise ValueError
+            position = [
+                self.model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, token['p'])
+            ]
+            return position, bool(token['r'])
+        except (binascii.Error, KeyError, TypeError, ValueError,
+                DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+def invert(field):
+    return field[1:] if field.startswith('-') else f'-{field}'
+
+
+def key_name(field):
+    return f'keyset_{field.lstrip("-")}'
+
+
+def after_position(ordering, position):
+    """Условие «строго после position» для лексикографической сортировки."""
+    condition = Q()
+    for index, field in enumerate(ordering):
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        step = Q(**{f'{field.lstrip("-")}__{lookup}': position[index]})
+        for previous, value in zip(ordering[:index], position):
+            step &= Q(**{previous.lstrip('-'): value})
+        condition |= step
+    return condition
+
+
+class FeedPagination(KeysetPagination):
+    ordering = ('-pub_date', '-recipe_id')
+
+
+class CursorOptInMixin:
+    """
+    Включает пагинацию по ключу, если в запросе передан параметр cursor
+    (в том числе пустой — для первой страницы).
+    """
+
+    cursor_pagination_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        cursor_param = self.cursor_pagination_class.cursor_query_param
+        if cursor_param not in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+        self.keyset = self.cursor_pagination_class()
+        self.keyset.page_size = self.page_size
+        self.keyset.page_size_query_param = self.page_size_query_param
+        self.keyset.max_page_size = self.max_page_size
+        return self.keyset.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class CustomPageNumberPagination(CursorOptInMixin, PageNumberPagination):
     page_size = PAGE_SIZE
     page_size_query_param = 'limit'
     max_page_size = MAX_PAGE_SIZE
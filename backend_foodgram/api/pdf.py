@@ -0,0 +1,67 @@
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+FONT_NAME = 'Arial'
+FONT_FILE = Path(__file__).resolve().parent / 'data' / 'arial.ttf'
+
+
+@lru_cache(maxsize=None)
+def register_font():
+    """Разбирает TTF один раз на процесс."""
+    pdfmetrics.registerFont(TTFont(FONT_NAME, FONT_FILE))
+    return FONT_NAME
+
+
+class ListPDFRenderer:
+    """
+    Постраничный список строк с заголовком на первой странице.
+
+    Строки страницы выводятся одним текстовым объектом, а готовый
+    документ записывается прямо в output (например, в HttpResponse)
+    без промежуточного буфера.
+    """
+
+    title_position = (200, 800)
+    title_size = 20
+    line_size = 14
+    left = 50
+    first_page_top = 750
+    page_top = 800
+    bottom = 50
+    leading = 20
+
+    def __init__(self, title):
+        self.title = title
+
+    def lines_per_page(self, top):
+        return (top - self.bottom - 1) // self.leading + 1
+
+    def render(self, lines, output):
+        font = register_font()
+        pdf = canvas.Canvas(output)
+        pdf.setFont(font, self.title_size)
+        pdf.drawString(*self.title_position, self.title)
+        lines = iter(lines)
+        top = self.first_page_top
+        page = list(islice(lines, self.lines_per_page(top)))
+        while True:
+            text = pdf.beginText(self.left, top)
+            text.setFont(font, self.line_size, self.leading)
+            for line in page:
+                text.textLine(line)
+            pdf.drawText(text)
+            pdf.showPage()
+            top = self.page_top
+            page = list(islice(lines, self.lines_per_page(top)))
+            if not page:
+                break
+        pdf.save()
+        return output
+
+
+shopping_list_pdf = ListPDFRenderer('Список покупок.')
@@ -0,0 +1,24 @@
+from django.http import Http404
+from rest_framework.response import Response
+
+from recipe.snapshot import SECTIONS, reference_data
+
+
+class ReferenceSnapshotMixin:
+    """list и retrieve справочника из общего снимка, без запросов к базе."""
+
+    def get_section(self):
+        return SECTIONS[self.queryset.model]
+
+    def list(self, request, *args, **kwargs):
+        return Response(reference_data.get().all(self.get_section()))
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            pk = int(self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+        except ValueError:
+            raise Http404
+        item = reference_data.get().get(self.get_section(), pk)
+        if item is None:
+            raise Http404
+        return Response(item)
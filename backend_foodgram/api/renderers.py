@@ -0,0 +1,57 @@
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import JSONRenderer
+
+
+class ShoppingListRenderer(JSONRenderer):
+    """
+    Формат списка покупок для согласования содержимого (?format=).
+
+    Сам документ формирует вьюсет, через рендерер проходят только
+    ошибки, и они отдаются в JSON.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = JSONRenderer.media_type
+        return super().render(
+            data, JSONRenderer.media_type, renderer_context
+        )
+
+
+class PDFRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+
+
+class PlainTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class CSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+# PDF первым: он отдаётся, если клиент не выбрал формат.
+SHOPPING_LIST_RENDERERS = (
+    PDFRenderer, PlainTextRenderer, CSVRenderer, JSONRenderer
+)
+
+
+class FormatParameterNegotiation(DefaultContentNegotiation):
+    """
+    Формат только по ?format=, заголовок Accept не учитывается:
+    браузеры и HTTP-клиенты присылают свои Accept по умолчанию,
+    а без параметра всегда отдаётся первый рендерер.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        format = format_suffix or request.query_params.get(
+            self.settings.URL_FORMAT_OVERRIDE
+        )
+        if format:
+            renderers = self.filter_renderers(renderers, format)
+        renderer = renderers[0]
+        return renderer, renderer.media_type
@@ -0,0 +1,271 @@
+import abc
+import heapq
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramSimilarity
+)
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.db.models import (
+    Case,
+    F,
+    FloatField,
+    OuterRef,
+    Prefetch,
+    Q,
+    Subquery,
+    Value,
+    When
+)
+from django.utils.module_loading import import_string
+from rest_framework.filters import BaseFilterBackend
+
+from recipe.models import IngredientRecipe, Recipe, Tag
+
+from .constants import (
+    SEARCH_CHUNK_SIZE,
+    SEARCH_CONFIG,
+    SEARCH_MEMORY_LIMIT,
+    SEARCH_WEIGHTS
+)
+from .stemmer import tokenize
+
+
+def chunked_ids(queryset, chunk_size=SEARCH_CHUNK_SIZE):
+    last_pk = 0
+    while True:
+        pks = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', flat=True)[:chunk_size]
+        )
+        if not pks:
+            return
+        yield pks
+        last_pk = pks[-1]
+
+
+class SearchBackend(abc.ABC):
+    """Поиск рецептов по названию, тексту, тегам и ингредиентам."""
+
+    @abc.abstractmethod
+    def search(self, queryset, query):
+        """Рецепты, подходящие под запрос, по убыванию search_rank."""
+
+    @abc.abstractmethod
+    def index(self, recipe_ids):
+        """Обновляет индекс для созданных или изменённых рецептов."""
+
+    def remove(self, recipe_ids):
+        """Убирает удалённые рецепты из индекса."""
+
+    def rebuild(self):
+        for pks in chunked_ids(Recipe.objects.all()):
+            self.index(pks)
+
+    def order_by_rank(self, queryset):
+        return queryset.order_by('-search_rank', *Recipe._meta.ordering)
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    Полнотекстовый поиск PostgreSQL с русской конфигурацией:
+    tsvector хранится в Recipe.search_vector (GIN-индекс), а похожесть
+    по триграммам названия находит слова с опечатками и их части.
+    """
+
+    config = SEARCH_CONFIG
+
+    def get_vector(self):
+        ingredients = IngredientRecipe.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            names=StringAgg('ingredient__name', ' ')
+        ).values('names')
+        tags = Recipe.tags.through.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            names=StringAgg('tag__name', ' ')
+        ).values('names')
+        return (
+            SearchVector('name', weight='A', config=self.config)
+            + SearchVector(Subquery(tags), weight='B', config=self.config)
+            + SearchVector(
+                Subquery(ingredients), weight='B', config=self.config
+            )
+            + SearchVector('text', weight='C', config=self.config)
+        )
+
+    def search(self, queryset, query):
+        search_query = SearchQuery(query, config=self.config)
+        return self.order_by_rank(
+            queryset.annotate(
+                search_rank=(
+                    SearchRank(F('search_vector'), search_query)
+                    + TrigramSimilarity('name', query)
+                )
+            ).filter(
+                Q(search_vector=search_query) | Q(name__trigram_similar=query)
+            )
+        )
+
+    def index(self, recipe_ids):
+        """Пересчитывает tsvector одним UPDATE в текущей транзакции."""
+        Recipe.objects.filter(pk__in=recipe_ids).update(
+            search_vector=self.get_vector()
+        )
+
+
+class MemorySearchBackend(SearchBackend):
+    """
+    Инвертированный индекс «основа слова → {рецепт: вес}» в памяти
+    процесса, со стеммингом русского языка. Только для разработки
+    и тестов на SQLite: каждый процесс строит свой индекс при первом
+    поиске и не видит рецепты, изменённые в других процессах.
+    Выдача ограничена limit лучшими рецептами.
+    """
+
+    vendors = ('sqlite',)
+    weights = SEARCH_WEIGHTS
+    limit = SEARCH_MEMORY_LIMIT
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.postings = None
+        self.terms = {}
+
+    def search(self, queryset, query):
+        scores = self.rank(query)
+        if not scores:
+            return queryset.none()
+        # Новые рецепты выше при равном весе, как в Recipe.ordering.
+        scores = dict(heapq.nlargest(
+            self.limit, scores.items(), key=lambda item: (item[1], item[0])
+        ))
+        return self.order_by_rank(
+            queryset.filter(pk__in=scores).annotate(
+                search_rank=Case(
+                    *(When(pk=pk, then=Value(score))
+                      for pk, score in scores.items()),
+                    default=Value(0.0),
+                    output_field=FloatField()
+                )
+            )
+        )
+
+    def rank(self, query):
+        """Рецепты, содержащие все слова запроса, с суммой их весов."""
+        terms = set(tokenize(query))
+        if not terms:
+            return {}
+        postings = self.get_postings()
+        with self.lock:
+            matches = [postings.get(term, {}) for term in terms]
+            pks = set.intersection(*(set(match) for match in matches))
+            return {
+                pk: sum(match[pk] for match in matches) for pk in pks
+            }
+
+    def get_postings(self):
+        if self.postings is None:
+            with self.lock:
+                if self.postings is None:
+                    self.postings = defaultdict(dict)
+                    self.terms = {}
+                    for pks in chunked_ids(Recipe.objects.all()):
+                        self.add(pks)
+        return self.postings
+
+    def index(self, recipe_ids):
+        recipe_ids = list(recipe_ids)
+        transaction.on_commit(lambda: self.reindex(recipe_ids))
+
+    def reindex(self, recipe_ids):
+        if self.postings is None:
+            return
+        with self.lock:
+            self.discard(recipe_ids)
+            self.add(recipe_ids)
+
+    def remove(self, recipe_ids):
+        recipe_ids = list(recipe_ids)
+        transaction.on_commit(lambda: self.discard(recipe_ids))
+
+    def rebuild(self):
+        with self.lock:
+            self.postings = None
+            self.get_postings()
+
+    def add(self, recipe_ids):
+        recipes = Recipe.objects.filter(pk__in=recipe_ids).only(
+            'name', 'text'
+        ).prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.only('name')),
+            Prefetch('ingredients'),
+        )
+        for recipe in recipes:
+            document = {
+                'name': recipe.name,
+                'text': recipe.text,
+                'tags': ' '.join(tag.name for tag in recipe.tags.all()),
+                'ingredients': ' '.join(
+                    ingredient.name for ingredient in recipe.ingredients.all()
+                ),
+            }
+            scores = defaultdict(float)
+            for field, value in document.items():
+                for term in set(tokenize(value)):
+                    scores[term] += self.weights[field]
+            for term, score in scores.items():
+                self.postings[term][recipe.pk] = score
+            self.terms[recipe.pk] = set(scores)
+
+    def discard(self, recipe_ids):
+        if self.postings is None:
+            return
+        with self.lock:
+            for pk in recipe_ids:
+                for term in self.terms.pop(pk, ()):
+                    self.postings[term].pop(pk, None)
+                    if not self.postings[term]:
+                        del self.postings[term]
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    """
+    Бэкенд из настройки RECIPE_SEARCH_BACKEND, а если она не задана —
+    PostgreSQL для postgresql и встроенный индекс для SQLite.
+    """
+    if settings.RECIPE_SEARCH_BACKEND:
+        backend = import_string(settings.RECIPE_SEARCH_BACKEND)()
+    elif connection.vendor == 'postgresql':
+        backend = PostgresSearchBackend()
+    else:
+        backend = MemorySearchBackend()
+    vendors = getattr(backend, 'vendors', None)
+    if vendors is not None and connection.vendor not in vendors:
+        raise ImproperlyConfigured(
+            f'{type(backend).__name__} не поддерживает базу '
+            f'{connection.vendor}'
+        )
+    return backend
+
+
+class RecipeSearchFilter(BaseFilterBackend):
+    """Поиск ?search= с ранжированием результатов."""
+
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return get_search_backend().search(queryset, query)
@@ -1,20 +1,59 @@
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework.reverse import reverse
-from rest_framework.validators import UniqueTogetherValidator
+from rest_framework.settings import api_settings
 
+from recipe.feed import fan_out_recipe
 from recipe.models import (
-    Favorite,
     Ingredient,
     IngredientRecipe,
-    LinkMapped,
     Recipe,
-    ShoppingCart,
+    ShoppingListJob,
     Tag
 )
+from recipe.snapshot import SECTIONS, reference_data
+from recipe.totals import change_recipe_totals
 from user.serializers import Base64ImageField, UserSerializer
 
+from .cache import recipe_fragments
+from .constants import RECIPE_BATCH_LIMIT, REFERENCE_DELETED
+from .fieldsets import SparseFieldsetMixin
+from .optimizers import optimize_queryset
+from .search import get_search_backend
+
+
+def absolute_url(request, url):
+    if request is None or not url:
+        return url
+    return request.build_absolute_uri(url)
+
+
+class ReferencePrimaryKeyField(serializers.PrimaryKeyRelatedField):
+    """
+    id тега или ингредиента, проверяемый по снимку справочников
+    вместо запроса к базе на каждый id.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        queryset = self.get_queryset()
+        section = SECTIONS[queryset.model]
+        item = (
+            reference_data.get().get(section, pk)
+            or reference_data.refresh().get(section, pk)
+        )
+        if item is None:
+            self.fail('does_not_exist', pk_value=data)
+        return queryset.model.from_db(
+            queryset.db, list(item), list(item.values())
+        )
+
 
 class TagSerializer(serializers.ModelSerializer):
 
@@ -31,7 +70,7 @@ class IngredientSerializer(serializers.ModelSerializer):
 
 
 class IngredientRecipeSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = ReferencePrimaryKeyField(queryset=Ingredient.objects.all())
 
     class Meta:
         model = IngredientRecipe
@@ -56,7 +95,23 @@ class IngredientFullSerializer(serializers.ModelSerializer):
         )
 
 
-class RecipeGETSerializer(serializers.ModelSerializer):
+class RecipeListSerializer(serializers.ListSerializer):
+    """Достаёт фрагменты всех рецептов страницы одним запросом к кэшу."""
+
+    def to_representation(self, data):
+        recipes = list(data.all() if hasattr(data, 'all') else data)
+        self.fragments, self.versions = recipe_fragments.get_many(
+            (recipe.pk for recipe in recipes),
+            self.child.fieldset_signature
+        )
+        self.fresh = self.child.load_fresh([
+            recipe.pk for recipe in recipes
+            if recipe.pk not in self.fragments
+        ])
+        return super().to_representation(recipes)
+
+
+class RecipeGETSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     author = UserSerializer(read_only=True)
     ingredients = IngredientFullSerializer(source='ingredientrecipe_set',
@@ -77,22 +132,103 @@ class RecipeGETSerializer(serializers.ModelSerializer):
                   'text',
                   'cooking_time'
                   )
+        list_serializer_class = RecipeListSerializer
+        compact_fields = (
+            'id,name,image,cooking_time,is_favorited,is_in_shopping_cart,'
+            'author.id,author.first_name,author.last_name'
+        )
 
     def get_is_favorited(self, object):
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
+        if hasattr(object, 'is_favorited'):
+            return object.is_favorited
         return request.user.follower_recipe.filter(recipe=object).exists()
 
     def get_is_in_shopping_cart(self, object):
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
+        if hasattr(object, 'is_in_shopping_cart'):
+            return object.is_in_shopping_cart
         return request.user.shopping_cart_user.filter(
             recipe=object).exists()
 
+    def get_fragment_serializer(self, recipe=None):
+        return type(self)(recipe, context={
+            'fragment': True,
+            'fields': self.context.get('fields'),
+            'omit': self.context.get('omit'),
+        })
+
+    def load_fresh(self, recipe_ids):
+        """
+        Заново читает рецепты без фрагментов в кэше. Версии к этому
+        моменту уже прочитаны, поэтому фрагмент не попадёт в кэш под
+        версией новее данных, из которых он построен.
+        """
+        if not recipe_ids:
+            return {}
+        return {
+            recipe.pk: recipe for recipe in optimize_queryset(
+                Recipe.objects.filter(pk__in=recipe_ids),
+                self.get_fragment_serializer()
+            )
+        }
+
+    def get_fragment(self, recipe):
+        """Представление рецепта без полей, зависящих от пользователя."""
+        signature = self.fieldset_signature
+        fragments = getattr(self.parent, 'fragments', None)
+        if fragments is None:
+            fragments, versions = recipe_fragments.get_many(
+                (recipe.pk,), signature
+            )
+            fresh = None
+        else:
+            versions, fresh = self.parent.versions, self.parent.fresh
+        if recipe.pk in fragments:
+            return fragments[recipe.pk]
+        if fresh is None:
+            fresh = self.load_fresh((recipe.pk,))
+        if recipe.pk not in fresh:
+            # Рецепт удалён после загрузки: фрагмент не кэшируется.
+            return self.get_fragment_serializer(recipe).data
+        fragment = self.get_fragment_serializer(fresh[recipe.pk]).data
+        recipe_fragments.set(
+            recipe.pk, versions[recipe.pk], fragment, signature
+        )
+        return fragment
+
+    def to_representation(self, recipe):
+        if self.context.get('fragment'):
+            return super().to_representation(recipe)
+        request = self.context.get('request')
+        data = dict(self.get_fragment(recipe))
+        if 'author' in data:
+            author = data['author'] = dict(data['author'])
+            if 'is_subscribed' in author:
+                if hasattr(recipe, 'author_is_subscribed'):
+                    recipe.author.is_subscribed = recipe.author_is_subscribed
+                author['is_subscribed'] = (
+                    self.fields['author'].get_is_subscribed(recipe.author)
+                )
+            if 'avatar' in author:
+                author['avatar'] = absolute_url(request, author['avatar'])
+        if 'is_favorited' in data:
+            data['is_favorited'] = self.get_is_favorited(recipe)
+        if 'is_in_shopping_cart' in data:
+            data['is_in_shopping_cart'] = self.get_is_in_shopping_cart(recipe)
+        if 'image' in data:
+            data['image'] = absolute_url(request, data['image'])
+        return data
+
 
 class RecipeSerializer(serializers.ModelSerializer):
+    tags = ReferencePrimaryKeyField(
+        queryset=Tag.objects.all(), many=True, allow_empty=False, label='Тег'
+    )
     ingredients = IngredientRecipeSerializer(many=True, required=True)
     image = Base64ImageField(use_url=True, max_length=None, required=True)
 
@@ -142,6 +278,18 @@ class RecipeSerializer(serializers.ModelSerializer):
                 'Ингредиенты рецепта должны быть'
             )
 
+    def save(self, **kwargs):
+        # Теги и ингредиенты проверяются по снимку, который может
+        # отставать от базы: удалённый id проходит проверку, и запись
+        # падает на внешнем ключе (в PostgreSQL — при фиксации).
+        try:
+            return super().save(**kwargs)
+        except IntegrityError:
+            reference_data.expire()
+            raise ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [REFERENCE_DELETED]}
+            )
+
     @transaction.atomic
     def create(self, validated_data):
         if 'image' not in validated_data or not validated_data['image']:
@@ -152,6 +300,8 @@ class RecipeSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(author=author, **validated_data)
         recipe.tags.set(tags_data)
         self.add_ingredients(ingredients_data, recipe)
+        get_search_backend().index((recipe.pk,))
+        transaction.on_commit(lambda: fan_out_recipe(recipe))
         return recipe
 
     @transaction.atomic
@@ -169,8 +319,14 @@ class RecipeSerializer(serializers.ModelSerializer):
         ingredients_data = validated_data.pop('ingredients', None)
         IngredientRecipe.objects.filter(recipe=instance).delete()
         self.add_ingredients(ingredients_data, instance)
+        # bulk_create не отправляет post_save: итоги списков покупок
+        # дополняются новыми строками явно, удалённые вычтены сигналами.
+        change_recipe_totals(instance.pk, {}, {
+            ingredient['id'].pk: ingredient['amount']
+            for ingredient in ingredients_data
+        })
         instance = super().update(instance, validated_data)
-        instance.save()
+        get_search_backend().index((instance.pk,))
         return instance
 
     def to_representation(self, recipe):
@@ -178,50 +334,29 @@ class RecipeSerializer(serializers.ModelSerializer):
         return serializer.data
 
 
-class FavoriteSerializer(serializers.ModelSerializer):
-
-    class Meta:
-        model = Favorite
-        fields = '__all__'
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Favorite.objects.all(),
-                fields=('user', 'recipe'),
-                message='Вы уже добавляли это рецепт в избранное'
-            )
-        ]
-
-
-class ShoppingCartSerializer(serializers.ModelSerializer):
-
-    class Meta:
-        model = ShoppingCart
-        fields = '__all__'
-        validators = [
-            UniqueTogetherValidator(
-                queryset=ShoppingCart.objects.all(),
-                fields=('recipe', 'user'),
-                message='Вы уже добавляли это рецепт в список покупок'
-            )
-        ]
+class RecipeBatchSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=RECIPE_BATCH_LIMIT
+    )
 
 
-class ShortenerSerializer(serializers.ModelSerializer):
+class ShoppingListJobSerializer(serializers.ModelSerializer):
+    file = serializers.SerializerMethodField()
 
     class Meta:
-        model = LinkMapped
-        fields = ('original_url',)
-        write_only_fields = ('original_url',)
-
-    def get_short_link(self, obj):
-        request = self.context.get('request')
-        return request.build_absolute_uri(
-            reverse('load_url', args=[obj.url_hash])
+        model = ShoppingListJob
+        fields = (
+            'id', 'status', 'progress', 'lines', 'created_at', 'finished_at',
+            'file'
         )
 
-    def create(self, validated_data):
-        instance, _ = LinkMapped.objects.get_or_create(**validated_data)
-        return instance
-
-    def to_representation(self, instance):
-        return {'short-link': self.get_short_link(instance)}
+    def get_file(self, obj):
+        if obj.status != ShoppingListJob.Status.DONE:
+            return None
+        return reverse(
+            'api:recipes-shopping-list-file',
+            args=(obj.pk,),
+            request=self.context.get('request')
+        )
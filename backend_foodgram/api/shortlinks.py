@@ -0,0 +1,90 @@
+import string
+from functools import lru_cache
+
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from recipe.models import LinkMapped
+
+from .constants import (
+    HASH_LENGTH,
+    SHORT_LINK_CACHE_SIZE,
+    SHORT_LINK_CHECKSUM_LENGTH
+)
+
+ALPHABET = string.digits + string.ascii_letters
+RECIPE_PATH = '/recipes/{}'
+
+
+def to_base62(number):
+    if number < 0:
+        raise ValueError('Отрицательное число нельзя записать в base62')
+    digits = ''
+    while True:
+        number, digit = divmod(number, len(ALPHABET))
+        digits = ALPHABET[digit] + digits
+        if not number:
+            return digits
+
+
+def from_base62(digits):
+    number = 0
+    for digit in digits:
+        number = number * len(ALPHABET) + ALPHABET.index(digit)
+    return number
+
+
+def checksum(value):
+    digest = salted_hmac('api.shortlinks', value).digest()
+    number = int.from_bytes(digest[:8], 'big')
+    return to_base62(number)[-SHORT_LINK_CHECKSUM_LENGTH:].rjust(
+        SHORT_LINK_CHECKSUM_LENGTH, ALPHABET[0]
+    )
+
+
+def make_code(recipe_id):
+    """
+    Короткий код рецепта: id в base62 и контрольная сумма на SECRET_KEY.
+    Код вычисляется без обращения к базе и не меняется.
+    """
+    value = to_base62(recipe_id)
+    return value + checksum(value)
+
+
+def parse_code(code):
+    """id рецепта из кода или None, если код не наш или подделан."""
+    value = code[:-SHORT_LINK_CHECKSUM_LENGTH]
+    if (not value or len(code) >= HASH_LENGTH
+            or any(char not in ALPHABET for char in code)):
+        return None
+    if not constant_time_compare(
+        code[-SHORT_LINK_CHECKSUM_LENGTH:], checksum(value)
+    ):
+        return None
+    return from_base62(value)
+
+
+def resolve(code):
+    """Адрес перехода по коду или None, если код неизвестен."""
+    try:
+        return resolve_known(code)
+    except LookupError:
+        return None
+
+
+@lru_cache(maxsize=SHORT_LINK_CACHE_SIZE)
+def resolve_known(code):
+    """
+    Коды длины HASH_LENGTH выдавались раньше через LinkMapped и ищутся
+    в базе; соответствие не меняется, поэтому результат кэшируется
+    в процессе. Неизвестный код вызывает LookupError: исключения
+    lru_cache не запоминает, так что промахи не кэшируются.
+    """
+    recipe_id = parse_code(code)
+    if recipe_id is not None:
+        return RECIPE_PATH.format(recipe_id)
+    original_url = LinkMapped.objects.filter(url_hash=code).values_list(
+        'original_url', flat=True
+    ).first()
+    if original_url is None:
+        raise LookupError(code)
+    return original_url
@@ -0,0 +1,131 @@
+from django.core.signals import request_started
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete
+)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipe.models import (
+    Ingredient,
+    IngredientRecipe,
+    Recipe,
+    ShoppingCart,
+    Tag
+)
+from user.models import User
+
+from .authentication import token_users
+from .autocomplete import ingredient_index
+from .cache import recipe_fragments, recipe_responses, shopping_lists
+from .constants import AUTHOR_FIELDS
+from .search import get_search_backend
+
+
+def carted_by(recipes):
+    return ShoppingCart.objects.filter(recipe__in=recipes).values_list(
+        'user_id', flat=True
+    )
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    recipe_responses.invalidate()
+    recipe_fragments.invalidate((instance.pk,))
+    shopping_lists.invalidate(carted_by((instance.pk,)))
+
+
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def cart_changed(sender, instance, **kwargs):
+    shopping_lists.invalidate((instance.user_id,))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    get_search_backend().remove((instance.pk,))
+
+
+@receiver(post_save, sender=IngredientRecipe)
+@receiver(post_delete, sender=IngredientRecipe)
+def recipe_ingredients_changed(sender, instance, **kwargs):
+    recipe_responses.invalidate()
+    recipe_fragments.invalidate((instance.recipe_id,))
+    shopping_lists.invalidate(carted_by((instance.recipe_id,)))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    recipe_responses.invalidate()
+    if not reverse:
+        recipe_fragments.invalidate((instance.pk,))
+    elif pk_set is not None:
+        recipe_fragments.invalidate(pk_set)
+    else:
+        recipe_fragments.invalidate(
+            instance.recipes.values_list('pk', flat=True)
+        )
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def tag_changed(sender, instance, **kwargs):
+    recipe_responses.invalidate()
+    recipe_fragments.invalidate(
+        instance.recipes.values_list('pk', flat=True)
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def ingredient_changed(sender, instance, **kwargs):
+    ingredient_index.invalidate()
+    recipe_responses.invalidate()
+    recipe_fragments.invalidate(
+        instance.recipes.values_list('pk', flat=True)
+    )
+    shopping_lists.invalidate(carted_by(instance.recipes.all()))
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    if created or (update_fields and AUTHOR_FIELDS.isdisjoint(update_fields)):
+        return
+    recipe_responses.invalidate()
+    recipe_fragments.invalidate(
+        instance.recipes.values_list('pk', flat=True)
+    )
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, **kwargs):
+    # Пароль, активность, роль и профиль в request.user должны
+    # обновляться сразу, поэтому сбрасывается любое сохранение.
+    if not created:
+        token_users.invalidate(
+            Token.objects.filter(user=instance).values_list('key', flat=True)
+        )
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    token_users.invalidate((instance.key,))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def reindex_renamed(sender, instance, created, **kwargs):
+    if not created:
+        get_search_backend().index(
+            instance.recipes.values_list('pk', flat=True)
+        )
+
+
+@receiver(request_started)
+def warm_indexes(sender, **kwargs):
+    ingredient_index.warm()
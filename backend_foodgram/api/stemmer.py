@@ -0,0 +1,133 @@
+"""
+Стеммер русского языка по алгоритму Snowball (Russian stemming algorithm).
+Используется встроенным поисковым индексом, когда полнотекстовый поиск
+PostgreSQL недоступен.
+"""
+import re
+
+VOWELS = 'аеиоуыэюя'
+WORD = re.compile(r'\w+')
+STOP_WORDS = frozenset((
+    'а', 'в', 'во', 'для', 'до', 'за', 'и', 'из', 'или', 'к', 'на', 'не',
+    'о', 'об', 'от', 'по', 'с', 'со', 'у',
+))
+
+# Окончания из первой группы допустимы только после «а» или «я».
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = ((), (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+))
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ((), ('ся', 'сь'))
+VERB = (
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN = ((), (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+    'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+    'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+    'ья', 'я',
+))
+DERIVATIONAL = ('ость', 'ост')
+SUPERLATIVE = ('ейше', 'ейш')
+
+
+def normalize(text):
+    return text.casefold().replace('ё', 'е')
+
+
+def tokenize(text):
+    """Нормализованные основы слов текста без стоп-слов."""
+    return [
+        stem(word) for word in WORD.findall(normalize(text))
+        if word not in STOP_WORDS
+    ]
+
+
+def remove_ending(word, groups):
+    """
+    Отрезает самое длинное из окончаний групп. Возвращает None,
+    если окончания нет или не выполнено условие первой группы.
+    """
+    after_a, plain = groups
+    ending = max(
+        (ending for ending in after_a + plain if word.endswith(ending)),
+        key=len,
+        default=None
+    )
+    if ending is None:
+        return None
+    base = word[:-len(ending)]
+    if ending in plain or base.endswith(('а', 'я')):
+        return base
+    return None
+
+
+def region(word, start=0):
+    """Позиция после первой согласной, следующей за гласной."""
+    for index in range(start + 1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            return index + 1
+    return len(word)
+
+
+def stem(word):
+    word = normalize(word)
+    rv_start = next(
+        (index + 1 for index, char in enumerate(word) if char in VOWELS),
+        None
+    )
+    if rv_start is None:
+        return word
+    r2_start = region(word, region(word))
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    base = remove_ending(rv, PERFECTIVE_GERUND)
+    if base is not None:
+        rv = base
+    else:
+        base = remove_ending(rv, REFLEXIVE)
+        if base is not None:
+            rv = base
+        base = remove_ending(rv, ADJECTIVE)
+        if base is not None:
+            rv = remove_ending(base, PARTICIPLE)
+            if rv is None:
+                rv = base
+        else:
+            base = remove_ending(rv, VERB)
+            if base is None:
+                base = remove_ending(rv, NOUN)
+            if base is not None:
+                rv = base
+
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    for ending in DERIVATIONAL:
+        if (rv.endswith(ending)
+                and len(prefix) + len(rv) - len(ending) >= r2_start):
+            rv = rv[:-len(ending)]
+            break
+
+    if rv.endswith(SUPERLATIVE):
+        rv = rv[:-(4 if rv.endswith('ейше') else 3)]
+        if rv.endswith('нн'):
+            rv = rv[:-1]
+    elif rv.endswith('нн'):
+        rv = rv[:-1]
+    elif rv.endswith('ь'):
+        rv = rv[:-1]
+    return prefix + rv
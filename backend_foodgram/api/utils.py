@@ -1,77 +1,299 @@
-import io
-from pathlib import Path
+import csv
+import json
 
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
 from rest_framework import serializers, status
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
-from recipe.models import Recipe
+from recipe.models import Recipe, ShoppingListTotal
 from user.serializers import SubscriptionRecipeShortSerializer
 
+from .constants import NOTHING_TO_DELETE, SHOPPING_LIST_CONTENT_TYPES
+from .pdf import shopping_list_pdf
+from .serializers import RecipeBatchSerializer
 
-def create_shopping_cart(ingredients_cart):
-    """Функция для формирования списка покупок."""
-    response = HttpResponse(content_type='application/pdf')
+
+def shopping_cart_response(format='pdf', response_class=HttpResponse,
+                           content=b''):
+    response = response_class(
+        content, content_type=SHOPPING_LIST_CONTENT_TYPES[format]
+    )
     response['Content-Disposition'] = (
-        "attachment; filename='shopping_cart.pdf'"
+        f"attachment; filename='shopping_cart.{format}'"
     )
-    font_file = Path(__file__).resolve().parent / 'data' / 'arial.ttf'
-    pdfmetrics.registerFont(
-        TTFont('Arial', font_file, 'UTF-8')
+    return response
+
+
+def shopping_list_line(number, ingredient):
+    return (
+        f"{number}. {ingredient['ingredient__name']}: "
+        f"{ingredient['ingredient_value']} "
+        f"{ingredient['ingredient__measurement_unit']}."
     )
-    buffer = io.BytesIO()
-    pdf_file = canvas.Canvas(buffer)
-    pdf_file.setFont('Arial', 20)
-    pdf_file.drawString(200, 800, 'Список покупок.')
-    pdf_file.setFont('Arial', 14)
-    from_bottom = 750
+
+
+def get_ingredients_cart(user):
+    """Итоги корзины из таблицы, поддерживаемой приращениями."""
+    return ShoppingListTotal.objects.filter(user=user).values(
+        'ingredient__name',
+        'ingredient__measurement_unit',
+        ingredient_value=F('total')
+    ).order_by('ingredient__name')
+
+
+def create_shopping_cart(ingredients_cart):
+    """Функция для формирования списка покупок."""
+    return shopping_list_pdf.render(
+        (
+            shopping_list_line(number, ingredient)
+            for number, ingredient in enumerate(ingredients_cart, start=1)
+        ),
+        shopping_cart_response()
+    )
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def stream_txt(ingredients_cart):
+    yield f'{shopping_list_pdf.title}\n\n'
     for number, ingredient in enumerate(ingredients_cart, start=1):
-        pdf_file.drawString(
-            50,
-            from_bottom,
-            f"{number}. {ingredient['ingredient__name']}: "
-            f"{ingredient['ingredient_value']} "
-            f"{ingredient['ingredient__measurement_unit']}.",
-        )
-        from_bottom -= 20
-        if from_bottom <= 50:
-            from_bottom = 800
-            pdf_file.showPage()
-            pdf_file.setFont('Arial', 14)
-    pdf_file.showPage()
-    pdf_file.save()
-    pdf = buffer.getvalue()
-    buffer.close()
-    response.write(pdf)
-    return response
+        yield shopping_list_line(number, ingredient) + '\n'
+
+
+def stream_csv(ingredients_cart):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'amount', 'measurement_unit'))
+    for ingredient in ingredients_cart:
+        yield writer.writerow((
+            ingredient['ingredient__name'],
+            ingredient['ingredient_value'],
+            ingredient['ingredient__measurement_unit'],
+        ))
+
+
+def stream_json(ingredients_cart):
+    separator = ''
+    yield '['
+    for ingredient in ingredients_cart:
+        yield separator + json.dumps({
+            'name': ingredient['ingredient__name'],
+            'amount': ingredient['ingredient_value'],
+            'measurement_unit': ingredient['ingredient__measurement_unit'],
+        }, ensure_ascii=False)
+        separator = ','
+    yield ']'
+
 
+SHOPPING_LIST_STREAMS = {
+    'txt': stream_txt,
+    'csv': stream_csv,
+    'json': stream_json,
+}
 
-def handle_post_favorite_or_cart(request, pk, model):
+
+def stream_shopping_cart(ingredients_cart, format):
+    """
+    Список покупок в текстовом формате по частям, построчно из итератора
+    запроса, поэтому память не зависит от размера корзины.
+    """
+    return SHOPPING_LIST_STREAMS[format](ingredients_cart)
+
+
+def quote(name):
+    return connection.ops.quote_name(name)
+
+
+def get_fields(model, names):
+    fields = {field.attname: field for field in model._meta.concrete_fields}
+    return [fields[name] for name in names]
+
+
+def make_instances(model, names, rows):
+    """Объекты из строк RETURNING (первичный ключ, затем names)."""
+    instances = []
+    for pk, *values in rows:
+        instance = model(pk=pk, **dict(zip(names, values)))
+        instance._state.adding = False
+        instance._state.db = connection.alias
+        instances.append(instance)
+    return instances
+
+
+def insert_ignore(model, rows):
+    """
+    Вставляет строки одним INSERT ... ON CONFLICT DO NOTHING и возвращает
+    только созданные объекты; уже существующие строки пропускаются,
+    и параллельные запросы не падают с IntegrityError. Строки задаются
+    словарями по attname (user_id). post_save отправляется вручную,
+    чтобы счётчики и кэши обновлялись как при save().
+    """
+    names = list(rows[0])
+    fields = get_fields(model, names)
+    row_sql = f'({", ".join("%s" for _ in fields)})'
+    sql = (
+        f'INSERT INTO {quote(model._meta.db_table)} '
+        f'({", ".join(quote(field.column) for field in fields)}) '
+        f'VALUES {", ".join(row_sql for _ in rows)} '
+        'ON CONFLICT DO NOTHING '
+        f'RETURNING {quote(model._meta.pk.column)}, '
+        f'{", ".join(quote(field.column) for field in fields)}'
+    )
+    params = [
+        field.get_db_prep_save(row[field.attname], connection)
+        for row in rows for field in fields
+    ]
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            instances = make_instances(model, names, cursor.fetchall())
+        for instance in instances:
+            post_save.send(
+                sender=model, instance=instance, created=True,
+                update_fields=None, raw=False, using=connection.alias
+            )
+    return instances
+
+
+def insert_unique(model, **values):
+    """Создаёт одну строку или возвращает None, если она уже есть."""
+    created = insert_ignore(model, [values])
+    return created[0] if created else None
+
+
+def delete_existing(model, **values):
+    """
+    Удаляет строки одним DELETE и возвращает удалённые объекты.
+    Значение-список задаёт условие IN. post_delete отправляется вручную
+    для каждой строки. Если у модели есть получатели pre_delete, строки,
+    как в Collector, сначала читаются с блокировкой, и pre_delete
+    уходит до удаления.
+    """
+    names = list(values)
+    fields = get_fields(model, names)
+    with transaction.atomic():
+        if pre_delete.has_listeners(model):
+            instances = list(model.objects.select_for_update().filter(**{
+                name if not isinstance(value, (list, tuple, set))
+                else f'{name}__in': value
+                for name, value in values.items()
+            }))
+            if not instances:
+                return []
+            for instance in instances:
+                pre_delete.send(
+                    sender=model, instance=instance, using=connection.alias
+                )
+            deleted = {
+                instance.pk for instance in raw_delete(
+                    model, names, fields,
+                    {model._meta.pk.attname: [
+                        instance.pk for instance in instances
+                    ]}
+                )
+            }
+            instances = [
+                instance for instance in instances if instance.pk in deleted
+            ]
+        else:
+            instances = raw_delete(model, names, fields, values)
+        for instance in instances:
+            post_delete.send(
+                sender=model, instance=instance, using=connection.alias
+            )
+    return instances
+
+
+def raw_delete(model, names, fields, values):
+    """DELETE ... RETURNING по условиям values; объекты с полями names."""
+    conditions = []
+    params = []
+    for name, value in values.items():
+        field = get_fields(model, (name,))[0]
+        if isinstance(value, (list, tuple, set)):
+            conditions.append(
+                f'{quote(field.column)} IN '
+                f'({", ".join("%s" for _ in value)})'
+            )
+            params += [
+                field.get_db_prep_save(item, connection) for item in value
+            ]
+        else:
+            conditions.append(f'{quote(field.column)} = %s')
+            params.append(field.get_db_prep_save(value, connection))
+    sql = (
+        f'DELETE FROM {quote(model._meta.db_table)} '
+        f'WHERE {" AND ".join(conditions)} '
+        f'RETURNING {quote(model._meta.pk.column)}, '
+        f'{", ".join(quote(field.column) for field in fields)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return make_instances(model, names, cursor.fetchall())
+
+
+def handle_post_favorite_or_cart(request, pk, model, message):
     """Функция для POST запросов фаворит шопин карт."""
     recipe = get_object_or_404(Recipe, pk=pk)
-    serializer = model(
-        data={'user': request.user.id, 'recipe': recipe.id},
-        context={'request': request}
+    if insert_unique(model, user_id=request.user.id, recipe_id=recipe.id):
+        recipe_serializer = SubscriptionRecipeShortSerializer(recipe)
+        return Response(recipe_serializer.data, status=status.HTTP_201_CREATED)
+    raise serializers.ValidationError(
+        {api_settings.NON_FIELD_ERRORS_KEY: [message]}
     )
-    serializer.is_valid(raise_exception=True)
-    serializer.save()
-    recipe_serializer = SubscriptionRecipeShortSerializer(recipe)
-    return Response(recipe_serializer.data, status=status.HTTP_201_CREATED)
 
 
 def handle_delete_favorite_or_cart(request, pk, model):
     """Функция для Delete запросов фаворит шопин карт."""
-    recipe = get_object_or_404(Recipe, pk=pk)
-    delete_model = model.objects.filter(
-        user=request.user.id,
-        recipe=recipe.id)
-    if not delete_model.exists():
-        raise serializers.ValidationError(
-            'нельзя удалить то чего нет'
-        )
-    delete_model.delete()
+    if not delete_existing(model, user_id=request.user.id, recipe_id=pk):
+        get_object_or_404(Recipe, pk=pk)
+        raise serializers.ValidationError(NOTHING_TO_DELETE)
     return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+def handle_batch_favorite_or_cart(request, model, add):
+    """
+    Добавляет в избранное или список покупок (или удаляет) сразу
+    несколько рецептов и возвращает результат по каждому id.
+    """
+    serializer = RecipeBatchSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    recipe_ids = list(dict.fromkeys(serializer.validated_data['recipes']))
+    found = set(
+        Recipe.objects.filter(pk__in=recipe_ids).values_list('pk', flat=True)
+    )
+    changed = set()
+    if found and add:
+        changed = {
+            instance.recipe_id for instance in insert_ignore(model, [
+                {'user_id': request.user.id, 'recipe_id': recipe_id}
+                for recipe_id in recipe_ids if recipe_id in found
+            ])
+        }
+    elif found:
+        changed = {
+            instance.recipe_id for instance in delete_existing(
+                model, user_id=request.user.id, recipe_id=sorted(found)
+            )
+        }
+    done, skipped = ('created', 'exists') if add else ('deleted', 'missing')
+    return Response({'results': [
+        {
+            'id': recipe_id,
+            'status': (
+                'not_found' if recipe_id not in found
+                else done if recipe_id in changed
+                else skipped
+            ),
+        }
+        for recipe_id in recipe_ids
+    ]})
@@ -1,5 +1,9 @@
-from django.db.models import Sum
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.db.models.functions import Length
+from django.http import FileResponse, Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect
+from django.utils.cache import patch_cache_control
 from django.views.decorators.http import require_GET
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
@@ -7,53 +11,135 @@ from rest_framework.decorators import action
 from rest_framework.filters import OrderingFilter
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
+from recipe.feed import pulled_recipes
 from recipe.models import (
+    ContentVersion,
     Favorite,
+    FeedEntry,
     Ingredient,
-    IngredientRecipe,
-    LinkMapped,
     Recipe,
     ShoppingCart,
+    ShoppingListJob,
     Tag
 )
+from user.models import Subscription
 
+from .autocomplete import ingredient_index
+from .cache import AnonymousResponseCacheMixin, shopping_lists
+from .clicks import link_clicks
+from .conditional import ConditionalGetMixin
+from .constants import (
+    AUTOCOMPLETE_LIMIT,
+    FAVORITE_EXISTS,
+    MAX_PAGE_SIZE,
+    SHOPPING_CART_EXISTS,
+    SHOPPING_LIST_ASYNC_LINES,
+    UUID_PATTERN
+)
+from .fieldsets import SparseFieldsetViewMixin
 from .filters import IngredientSearchFilter, RecipeFilter
-from .pagination import CustomPageNumberPagination
+from .jobs import shopping_list_jobs
+from .optimizers import OptimizedQuerysetMixin
+from .pagination import CustomPageNumberPagination, FeedPagination
 from .permissions import AnonimReadOnly, IsSuperUserIsAdminIsAuthor
+from .reference import ReferenceSnapshotMixin
+from .renderers import SHOPPING_LIST_RENDERERS, FormatParameterNegotiation
+from .search import RecipeSearchFilter
 from .serializers import (
-    FavoriteSerializer,
     IngredientSerializer,
     RecipeGETSerializer,
     RecipeSerializer,
-    ShoppingCartSerializer,
-    ShortenerSerializer,
+    ShoppingListJobSerializer,
     TagSerializer
 )
+from .shortlinks import make_code, resolve
 from .utils import (
     create_shopping_cart,
+    get_ingredients_cart,
+    handle_batch_favorite_or_cart,
     handle_delete_favorite_or_cart,
-    handle_post_favorite_or_cart
+    handle_post_favorite_or_cart,
+    shopping_cart_response,
+    stream_shopping_cart
 )
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(AnonymousResponseCacheMixin, ConditionalGetMixin,
+                    OptimizedQuerysetMixin, SparseFieldsetViewMixin,
+                    viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
     pagination_class = CustomPageNumberPagination
-    filter_backends = (DjangoFilterBackend, OrderingFilter)
+    filter_backends = (DjangoFilterBackend, RecipeSearchFilter,
+                       OrderingFilter)
     http_method_names = ['get', 'post', 'patch', 'delete']
     filterset_class = RecipeFilter
+    content_versions = (ContentVersion.TAG, ContentVersion.INGREDIENT)
+    last_modified_field = 'updated_at'
 
     def get_permissions(self):
         if self.request.method == 'GET':
-            permission_classes = (AllowAny,)
-        else:
-            permission_classes = (AnonimReadOnly | IsSuperUserIsAdminIsAuthor,
-                                  IsAuthenticated)
+            # Чтение открыто, кроме действий со своими permission_classes.
+            return super().get_permissions()
+        permission_classes = (AnonimReadOnly | IsSuperUserIsAdminIsAuthor,
+                              IsAuthenticated)
         return [permission() for permission in permission_classes]
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset
+        return queryset.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            author_is_subscribed=Exists(Subscription.objects.filter(
+                follower=user, following=OuterRef('author'))),
+        )
+
+    def get_object_state(self, recipe):
+        return (
+            *super().get_object_state(recipe),
+            getattr(recipe, 'is_favorited', None),
+            getattr(recipe, 'is_in_shopping_cart', None),
+            getattr(recipe, 'author_is_subscribed', None),
+        )
+
+    @action(
+        detail=False,
+        methods=('post',),
+        url_path='favorite',
+        url_name='favorite-batch',
+        permission_classes=(IsAuthenticated,)
+    )
+    def add_favorites(self, request):
+        return handle_batch_favorite_or_cart(request, Favorite, add=True)
+
+    @add_favorites.mapping.delete
+    def delete_favorites(self, request):
+        return handle_batch_favorite_or_cart(request, Favorite, add=False)
+
+    @action(
+        detail=False,
+        methods=('post',),
+        url_path='shopping_cart',
+        url_name='shopping_cart-batch',
+        permission_classes=(IsAuthenticated,)
+    )
+    def add_to_shopping_cart(self, request):
+        return handle_batch_favorite_or_cart(request, ShoppingCart, add=True)
+
+    @add_to_shopping_cart.mapping.delete
+    def delete_from_shopping_cart(self, request):
+        return handle_batch_favorite_or_cart(
+            request, ShoppingCart, add=False
+        )
+
     @action(
         detail=True,
         methods=('post',),
@@ -62,7 +148,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=(IsAuthenticated,)
     )
     def get_favorite(self, request, pk):
-        return handle_post_favorite_or_cart(request, pk, FavoriteSerializer)
+        return handle_post_favorite_or_cart(
+            request, pk, Favorite, FAVORITE_EXISTS
+        )
 
     @get_favorite.mapping.delete
     def delete_favorite(self, request, pk):
@@ -76,8 +164,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=(IsAuthenticated,)
     )
     def get_shopping_cart(self, request, pk):
-        return handle_post_favorite_or_cart(request, pk,
-                                            ShoppingCartSerializer)
+        return handle_post_favorite_or_cart(
+            request, pk, ShoppingCart, SHOPPING_CART_EXISTS
+        )
 
     @get_shopping_cart.mapping.delete
     def delete_hopping_cart(self, request, pk):
@@ -88,21 +177,125 @@ class RecipeViewSet(viewsets.ModelViewSet):
         methods=('get',),
         url_path='download_shopping_cart',
         url_name='download_shopping_cart',
-        permission_classes=(IsAuthenticated,)
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=SHOPPING_LIST_RENDERERS,
+        content_negotiation_class=FormatParameterNegotiation
     )
     def download_shopping_cart(self, request):
         user = request.user
-        ingredients_cart = (
-            IngredientRecipe.objects.filter(
-                recipe__shopping_cart__user=user
-            ).values(
-                'ingredient__name',
-                'ingredient__measurement_unit',
-            ).order_by(
-                'ingredient__name'
-            ).annotate(ingredient_value=Sum('amount'))
+        format = request.accepted_renderer.format
+        key = shopping_lists.make_key(user.pk, format)
+        content = shopping_lists.get(key)
+        if content is not None:
+            response = shopping_cart_response(format, content=content)
+            response['X-Cache'] = 'HIT'
+            return response
+        ingredients_cart = get_ingredients_cart(user)
+        if format == 'pdf':
+            lines = ingredients_cart.count()
+            if lines > SHOPPING_LIST_ASYNC_LINES:
+                job = shopping_list_jobs.start(user, format, key, lines)
+                if job.status == job.Status.DONE:
+                    return self.job_response(job)
+                return self.job_response(job, status.HTTP_202_ACCEPTED)
+            response = create_shopping_cart(ingredients_cart)
+            shopping_lists.set(key, response.content)
+        else:
+            response = shopping_cart_response(
+                format,
+                StreamingHttpResponse,
+                shopping_lists.cache_stream(key, stream_shopping_cart(
+                    ingredients_cart.iterator(), format
+                ))
+            )
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def job_response(self, job, status_code=status.HTTP_200_OK):
+        url = reverse(
+            'api:recipes-shopping-list-job',
+            args=(job.pk,),
+            request=self.request
         )
-        return create_shopping_cart(ingredients_cart)
+        serializer = ShoppingListJobSerializer(
+            job, context=self.get_serializer_context()
+        )
+        return Response(
+            serializer.data, status=status_code, headers={'Location': url}
+        )
+
+    @action(
+        detail=False,
+        methods=('get',),
+        url_path=rf'download_shopping_cart/(?P<job_id>{UUID_PATTERN})',
+        url_name='shopping-list-job',
+        permission_classes=(IsAuthenticated,)
+    )
+    def shopping_list_job(self, request, job_id):
+        return self.job_response(get_object_or_404(
+            ShoppingListJob, pk=job_id, user=request.user
+        ))
+
+    @action(
+        detail=False,
+        methods=('get',),
+        url_path=rf'download_shopping_cart/(?P<job_id>{UUID_PATTERN})/file',
+        url_name='shopping-list-file',
+        permission_classes=(IsAuthenticated,)
+    )
+    def shopping_list_file(self, request, job_id):
+        job = get_object_or_404(
+            ShoppingListJob,
+            pk=job_id,
+            user=request.user,
+            status=ShoppingListJob.Status.DONE
+        )
+        prefix = settings.SHOPPING_LIST_ACCEL_PREFIX
+        if prefix:
+            response = shopping_cart_response(job.format)
+            response['X-Accel-Redirect'] = prefix + job.file_name
+            return response
+        return shopping_cart_response(
+            job.format,
+            FileResponse,
+            open(shopping_list_jobs.get_path(job), 'rb')
+        )
+
+    @action(
+        detail=False,
+        methods=('get',),
+        url_path='feed',
+        url_name='feed',
+        permission_classes=(IsAuthenticated,)
+    )
+    def feed(self, request):
+        """
+        Рецепты авторов из подписок, новые первыми: записи ленты
+        пользователя и подмешанные рецепты популярных авторов.
+        """
+        paginator = FeedPagination()
+        page = paginator.paginate_querysets(
+            (
+                (
+                    FeedEntry.objects.filter(user=request.user).only(
+                        'pub_date', 'recipe'
+                    ),
+                    paginator.ordering
+                ),
+                (
+                    pulled_recipes(request.user).only('pub_date'),
+                    ('-pub_date', '-id')
+                ),
+            ),
+            request,
+            self
+        )
+        recipe_ids = [entry.keyset_recipe_id for entry in page]
+        recipes = self.get_queryset().in_bulk(recipe_ids)
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in recipe_ids if pk in recipes], many=True
+        )
+        return paginator.get_paginated_response(serializer.data)
 
     @action(
         detail=True,
@@ -111,15 +304,19 @@ class RecipeViewSet(viewsets.ModelViewSet):
         url_name='get-link',
     )
     def get_link(self, request, pk):
-        original_url = f"http://foodgrampampam.zapto.org/recipes/{pk}"
-        serializer = ShortenerSerializer(
-            data={'original_url': original_url},
-            context={'request': request},
+        try:
+            recipe_id = int(pk)
+        except ValueError:
+            raise Http404
+        if recipe_id < 1:
+            raise Http404
+        code = make_code(recipe_id)
+        return Response(
+            {'short-link': reverse(
+                'load_url', args=(code,), request=request
+            )},
+            status=status.HTTP_200_OK
         )
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
-
-        return Response(serializer.data, status=status.HTTP_200_OK)
 
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -127,7 +324,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return RecipeSerializer
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(ConditionalGetMixin, ReferenceSnapshotMixin,
+                        ReadOnlyModelViewSet):
+    content_versions = (ContentVersion.INGREDIENT,)
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (AllowAny,)
@@ -135,8 +334,38 @@ class IngredientViewSet(ReadOnlyModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        """
+        С параметром name — автодополнение: не больше limit ингредиентов,
+        точное совпадение первым, затем более короткие названия.
+        """
+        name = request.query_params.get('name')
+        if not name:
+            return super().list(request, *args, **kwargs)
+        validators = self.get_validators()
+        not_modified = self.get_not_modified(validators)
+        if not_modified is not None:
+            return not_modified
+        limit = self.get_limit()
+        matches = ingredient_index.search(name, limit)
+        if matches is None:
+            queryset = self.filter_queryset(self.get_queryset()).order_by(
+                Length('name'), 'name', 'pk'
+            )[:limit]
+            matches = self.get_serializer(queryset, many=True).data
+        return self.set_validators(Response(matches), validators)
+
+    def get_limit(self):
+        try:
+            limit = int(self.request.query_params['limit'])
+        except (KeyError, ValueError):
+            return AUTOCOMPLETE_LIMIT
+        return min(max(limit, 1), MAX_PAGE_SIZE)
+
 
-class TagViewSet(ReadOnlyModelViewSet):
+class TagViewSet(ConditionalGetMixin, ReferenceSnapshotMixin,
+                 ReadOnlyModelViewSet):
+    content_versions = (ContentVersion.TAG,)
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (AllowAny,)
@@ -145,7 +374,12 @@ class TagViewSet(ReadOnlyModelViewSet):
 
 @require_GET
 def load_url(request, url_hash: str):
-    original_url = get_object_or_404(
-        LinkMapped, url_hash=url_hash
-    ).original_url
-    return redirect(original_url)
+    original_url = resolve(url_hash)
+    if original_url is None:
+        raise Http404
+    link_clicks.add(url_hash)
+    # Временный и некэшируемый редирект: каждый переход доходит
+    # до сервера и учитывается.
+    response = redirect(original_url)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -1,8 +1,18 @@
+import tempfile
 from pathlib import Path
 
 from environs import Env
 
-from api.constants import PER_PAGE
+from api.constants import (
+    AUTH_CACHE_ALIAS,
+    PER_PAGE,
+    RECIPE_CACHE_ALIAS,
+    RECIPE_CACHE_MAX_ENTRIES,
+    RECIPE_CACHE_TIMEOUT,
+    SHOPPING_LIST_CACHE_ALIAS,
+    SHOPPING_LIST_CACHE_MAX_ENTRIES,
+    SHOPPING_LIST_CACHE_TIMEOUT
+)
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 env = Env()
@@ -20,6 +30,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'django_filters',
@@ -71,6 +82,52 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    RECIPE_CACHE_ALIAS: {
+        'BACKEND': env(
+            'RECIPE_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': env('RECIPE_CACHE_LOCATION', RECIPE_CACHE_ALIAS),
+        'TIMEOUT': env.int('RECIPE_CACHE_TIMEOUT', RECIPE_CACHE_TIMEOUT),
+        'OPTIONS': {
+            'MAX_ENTRIES': env.int(
+                'RECIPE_CACHE_MAX_ENTRIES', RECIPE_CACHE_MAX_ENTRIES
+            ),
+        },
+    },
+    SHOPPING_LIST_CACHE_ALIAS: {
+        'BACKEND': env(
+            'SHOPPING_LIST_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': env(
+            'SHOPPING_LIST_CACHE_LOCATION', SHOPPING_LIST_CACHE_ALIAS
+        ),
+        'TIMEOUT': env.int(
+            'SHOPPING_LIST_CACHE_TIMEOUT', SHOPPING_LIST_CACHE_TIMEOUT
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': env.int(
+                'SHOPPING_LIST_CACHE_MAX_ENTRIES',
+                SHOPPING_LIST_CACHE_MAX_ENTRIES
+            ),
+        },
+    },
+    # Версии токенов: чтобы выход и смена пароля сразу действовали во всех
+    # воркерах, нужен общий бэкенд (Redis, Memcached).
+    AUTH_CACHE_ALIAS: {
+        'BACKEND': env(
+            'AUTH_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': env('AUTH_CACHE_LOCATION', AUTH_CACHE_ALIAS),
+    },
+}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -105,13 +162,23 @@ STATIC_ROOT = BASE_DIR / 'collected_static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Готовые списки покупок. Каталог не публикуется: nginx отдаёт файлы
+# из internal-локации по X-Accel-Redirect. Пустой префикс — отдавать
+# файлы из Django (для разработки без nginx).
+SHOPPING_LIST_ROOT = env.str(
+    'SHOPPING_LIST_ROOT', str(BASE_DIR / 'shopping_lists')
+)
+SHOPPING_LIST_ACCEL_PREFIX = env.str(
+    'SHOPPING_LIST_ACCEL_PREFIX', '/protected/shopping_lists/'
+)
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'user.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -120,6 +187,19 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': PER_PAGE,
 }
 
+COMPACT_LISTS = env.bool('COMPACT_LISTS', False)
+
+# Общий для воркеров файл снимка тегов и ингредиентов.
+REFERENCE_SNAPSHOT_PATH = env.str(
+    'REFERENCE_SNAPSHOT_PATH',
+    str(Path(tempfile.gettempdir()) / 'foodgram-reference.snapshot')
+)
+
+# Пусто: PostgreSQL для postgresql, встроенный индекс для SQLite.
+# Встроенный индекс живёт в памяти одного процесса и годится только
+# для разработки и тестов на SQLite.
+RECIPE_SEARCH_BACKEND = env.str('RECIPE_SEARCH_BACKEND', '')
+
 DJOSER = {
     'LOGIN_FIELD': 'email',
     'HIDE_USERS': False,
@@ -2,13 +2,16 @@ from django.contrib import admin
 from django.utils.html import mark_safe
 
 from api.constants import PER_PAGE
+from api.shortlinks import resolve
 
 from .models import (
     Favorite,
     Ingredient,
     IngredientRecipe,
+    LinkClick,
     Recipe,
     ShoppingCart,
+    ShoppingListJob,
     Tag
 )
 
@@ -69,6 +72,8 @@ class RecipeAdmin(admin.ModelAdmin):
         'text',
         'cooking_time',
         'pub_date',
+        'favorites_count',
+        'in_carts_count',
         'ingredient_list',
         'tag_list',
         'get_image',
@@ -151,3 +156,36 @@ class RecipeTagAdmin(admin.ModelAdmin):
     list_display = ('recipe', 'tag')
     search_fields = ('recipe__name', 'tag__name')
     list_filter = ('recipe__name', 'tag__name')
+
+
+@admin.register(ShoppingListJob)
+class ShoppingListJobAdmin(admin.ModelAdmin):
+    """Класс настройки раздела фонового формирования списков покупок."""
+
+    list_display = (
+        'pk',
+        'user',
+        'format',
+        'status',
+        'progress',
+        'lines',
+        'created_at',
+        'finished_at'
+    )
+    list_filter = ('status', 'format')
+    list_per_page = PER_PAGE
+
+
+@admin.register(LinkClick)
+class LinkClickAdmin(admin.ModelAdmin):
+    """Класс настройки раздела переходов по коротким ссылкам."""
+
+    list_display = ('code', 'target', 'day', 'clicks')
+    list_filter = ('day',)
+    search_fields = ('code',)
+    date_hierarchy = 'day'
+    list_per_page = PER_PAGE
+
+    @admin.display(description='Адрес')
+    def target(self, obj):
+        return resolve(obj.code)
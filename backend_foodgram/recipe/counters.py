@@ -0,0 +1,47 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from user.models import Subscription, User
+
+from .models import Favorite, Recipe, ShoppingCart
+
+# Поле-счётчик и связь, строки которой оно считает:
+# (модель, счётчик, считаемая модель, внешний ключ на модель).
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'in_carts_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Subscription, 'following'),
+)
+
+
+def change_counter(model, pk, field, delta):
+    """Атомарно меняет счётчик, не опуская его ниже нуля."""
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def count_subquery(related_model, related_field):
+    return Coalesce(
+        Subquery(
+            related_model.objects.filter(**{related_field: OuterRef('pk')})
+            .order_by()
+            .values(related_field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0
+    )
+
+
+def recount(model, field, related_model, related_field, pks):
+    """
+    Пересчитывает счётчик для строк pks одним UPDATE
+    и возвращает число исправленных строк.
+    """
+    actual = count_subquery(related_model, related_field)
+    return model.objects.filter(pk__in=pks).exclude(
+        **{field: actual}
+    ).update(**{field: actual})
@@ -0,0 +1,90 @@
+from django.db import connection
+
+from api.constants import FEED_BACKFILL_SIZE, FEED_PUSH_FOLLOWERS_LIMIT
+from user.models import Subscription, User
+
+from .models import FeedEntry, Recipe
+
+TABLE = FeedEntry._meta.db_table
+# Последние рецепты автора (или один рецепт) в ленты его подписчиков,
+# если автор не из тех, чьи рецепты подмешиваются при чтении.
+FILL = (
+    f'INSERT INTO {TABLE} (user_id, recipe_id, author_id, pub_date) '
+    'SELECT subscription.follower_id, recipe.id, recipe.author_id, '
+    'recipe.pub_date '
+    f'FROM {Subscription._meta.db_table} subscription '
+    'JOIN ('
+    f'SELECT id, author_id, pub_date FROM {Recipe._meta.db_table} '
+    'WHERE author_id = %s{recipes} ORDER BY pub_date DESC, id DESC LIMIT %s'
+    ') recipe ON recipe.author_id = subscription.following_id '
+    f'JOIN {User._meta.db_table} author '
+    'ON author.id = subscription.following_id '
+    'WHERE author.followers_count < %s{followers} '
+    'ON CONFLICT (user_id, recipe_id) DO NOTHING'
+)
+
+
+def fill_feeds(author_id, recipe_id=None, follower_id=None):
+    recipes = followers = ''
+    params = [author_id]
+    if recipe_id is not None:
+        recipes = ' AND id = %s'
+        params.append(recipe_id)
+    params += [FEED_BACKFILL_SIZE, FEED_PUSH_FOLLOWERS_LIMIT]
+    if follower_id is not None:
+        followers = ' AND subscription.follower_id = %s'
+        params.append(follower_id)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            FILL.format(recipes=recipes, followers=followers), params
+        )
+
+
+def fan_out_recipe(recipe):
+    """Раскладывает новый рецепт по лентам подписчиков автора."""
+    fill_feeds(recipe.author_id, recipe_id=recipe.pk)
+
+
+def followed(subscription):
+    """
+    Подписка создана: последние рецепты автора попадают в ленту,
+    а если автор только что стал популярным — его записи удаляются
+    из всех лент, дальше его рецепты подмешиваются при чтении.
+    """
+    if followers_count(subscription.following_id) >= (
+        FEED_PUSH_FOLLOWERS_LIMIT
+    ):
+        FeedEntry.objects.filter(author=subscription.following_id).delete()
+    else:
+        fill_feeds(
+            subscription.following_id, follower_id=subscription.follower_id
+        )
+
+
+def unfollowed(subscription):
+    """
+    Подписка удалена: рецепты автора уходят из ленты, а если автор
+    перестал быть популярным — его последние рецепты раскладываются
+    по лентам оставшихся подписчиков.
+    """
+    FeedEntry.objects.filter(
+        user=subscription.follower_id, author=subscription.following_id
+    ).delete()
+    if followers_count(subscription.following_id) == (
+        FEED_PUSH_FOLLOWERS_LIMIT - 1
+    ):
+        fill_feeds(subscription.following_id)
+
+
+def followers_count(author_id):
+    return User.objects.filter(pk=author_id).values_list(
+        'followers_count', flat=True
+    ).first() or 0
+
+
+def pulled_recipes(user):
+    """Рецепты популярных авторов из подписок: они не раскладываются."""
+    return Recipe.objects.filter(author__in=Subscription.objects.filter(
+        follower=user,
+        following__followers_count__gte=FEED_PUSH_FOLLOWERS_LIMIT
+    ).values('following'))
@@ -0,0 +1,147 @@
+import csv
+import io
+import json
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.constants import INGREDIENT_BATCH_SIZE, MAX_LENGTH
+from recipe.models import ContentVersion, Ingredient
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if row:
+            yield row[0], row[1] if len(row) > 1 else ''
+
+
+def read_json(file, chunk_size=64 * 1024):
+    """Читает массив объектов {name, measurement_unit} по одному."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    eof = False
+    while True:
+        buffer = buffer[position:].lstrip(' \t\r\n,')
+        position = 0
+        if not started and buffer.startswith('['):
+            buffer = buffer[1:].lstrip()
+            started = True
+        if buffer.startswith(']'):
+            return
+        try:
+            item, position = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                if buffer.strip():
+                    raise CommandError('Некорректный JSON')
+                return
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        yield item['name'], item.get('measurement_unit', '')
+
+
+READERS = {'.csv': read_csv, '.json': read_json}
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает ингредиенты из CSV (name,measurement_unit) или JSON '
+        'пачками. Уже существующие пары name/measurement_unit '
+        'пропускаются, поэтому команду можно запускать при каждом деплое.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', type=Path)
+        parser.add_argument(
+            '--batch-size', type=int, default=INGREDIENT_BATCH_SIZE
+        )
+        parser.add_argument(
+            '--method', choices=('auto', 'copy', 'bulk'), default='auto',
+            help='copy — COPY во временную таблицу (только PostgreSQL), '
+                 'bulk — bulk_create с игнорированием конфликтов.'
+        )
+
+    def handle(self, *args, paths, batch_size, method, **options):
+        if method == 'auto':
+            method = 'copy' if connection.vendor == 'postgresql' else 'bulk'
+        if method == 'copy' and connection.vendor != 'postgresql':
+            raise CommandError('COPY доступен только для PostgreSQL')
+        load = self.copy if method == 'copy' else self.bulk_create
+        inserted = skipped = invalid = 0
+        for path in paths:
+            reader = READERS.get(path.suffix.lower())
+            if reader is None:
+                raise CommandError(f'Неизвестный формат файла: {path}')
+            with open(path, encoding='utf-8') as file, transaction.atomic():
+                for batch in batches(reader(file), batch_size):
+                    rows = self.clean(batch)
+                    invalid += len(batch) - len(rows)
+                    added = load(rows)
+                    inserted += added
+                    skipped += len(rows) - added
+        if inserted:
+            ContentVersion.bump(ContentVersion.INGREDIENT)
+        self.stdout.write(self.style.SUCCESS(
+            f'Добавлено: {inserted}, пропущено: {skipped}, '
+            f'с ошибками: {invalid}'
+        ))
+
+    @staticmethod
+    def clean(batch):
+        rows = []
+        for name, measurement_unit in batch:
+            name, measurement_unit = name.strip(), measurement_unit.strip()
+            if (name and measurement_unit and len(name) <= MAX_LENGTH
+                    and len(measurement_unit) <= MAX_LENGTH):
+                rows.append((name, measurement_unit))
+        return rows
+
+    @staticmethod
+    def bulk_create(rows):
+        before = Ingredient.objects.count()
+        Ingredient.objects.bulk_create(
+            (Ingredient(name=name, measurement_unit=measurement_unit)
+             for name, measurement_unit in rows),
+            ignore_conflicts=True
+        )
+        return Ingredient.objects.count() - before
+
+    @staticmethod
+    def copy(rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        table = Ingredient._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE IF NOT EXISTS ingredient_staging '
+                '(name text, measurement_unit text) ON COMMIT DROP'
+            )
+            cursor.execute('TRUNCATE ingredient_staging')
+            cursor.copy_expert(
+                'COPY ingredient_staging (name, measurement_unit) '
+                'FROM STDIN WITH (FORMAT csv)',
+                buffer
+            )
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT DISTINCT name, measurement_unit '
+                'FROM ingredient_staging '
+                'ON CONFLICT (name, measurement_unit) DO NOTHING'
+            )
+            return cursor.rowcount
@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from api.constants import COUNTER_CHUNK_SIZE
+from recipe.models import ShoppingListTotal
+from recipe.totals import expected_totals, stored_totals
+from user.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет итоги списков покупок с корзинами и пересобирает '
+        'итоги разошедшихся пользователей.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только проверить, ничего не меняя.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=COUNTER_CHUNK_SIZE,
+            help='Сколько пользователей сверять за одну транзакцию.'
+        )
+
+    def handle(self, *args, verify, chunk_size, **options):
+        users = User.objects.filter(
+            Q(shopping_cart_user__isnull=False)
+            | Q(shopping_list_totals__isnull=False)
+        ).distinct().order_by('pk').values_list('pk', flat=True)
+        checked = mismatched = 0
+        last_pk = 0
+        while True:
+            pks = list(users.filter(pk__gt=last_pk)[:chunk_size])
+            if not pks:
+                break
+            with transaction.atomic():
+                expected = expected_totals(pks)
+                stored = stored_totals(pks)
+                broken = {
+                    user for user, _ in expected.keys() ^ stored.keys()
+                } | {
+                    user for (user, ingredient), total in expected.items()
+                    if stored.get((user, ingredient), total) != total
+                }
+                if broken and not verify:
+                    ShoppingListTotal.objects.filter(user__in=broken).delete()
+                    ShoppingListTotal.objects.bulk_create(
+                        ShoppingListTotal(
+                            user_id=user, ingredient_id=ingredient,
+                            total=total
+                        )
+                        for (user, ingredient), total in expected.items()
+                        if user in broken
+                    )
+            checked += len(pks)
+            mismatched += len(broken)
+            last_pk = pks[-1]
+        self.stdout.write(
+            f'Проверено пользователей: {checked}, '
+            f'с расхождениями: {mismatched}'
+            + ('' if verify else ' (пересобраны)')
+        )
+        if verify and mismatched:
+            raise CommandError('Итоги списков покупок расходятся с корзинами')
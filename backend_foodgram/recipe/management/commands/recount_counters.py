@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.constants import COUNTER_CHUNK_SIZE
+from recipe.counters import COUNTERS, recount
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики избранного, списков покупок, '
+        'рецептов и подписчиков порциями по первичному ключу.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=COUNTER_CHUNK_SIZE,
+            help='Сколько строк пересчитывать за одну транзакцию.'
+        )
+
+    def handle(self, *args, chunk_size, **options):
+        for model, field, related_model, related_field in COUNTERS:
+            fixed = 0
+            last_pk = 0
+            while True:
+                pks = list(
+                    model.objects.filter(pk__gt=last_pk).order_by('pk')
+                    .values_list('pk', flat=True)[:chunk_size]
+                )
+                if not pks:
+                    break
+                with transaction.atomic():
+                    fixed += recount(
+                        model, field, related_model, related_field, pks
+                    )
+                last_pk = pks[-1]
+            self.stdout.write(
+                f'{model._meta.label}.{field}: исправлено {fixed}'
+            )
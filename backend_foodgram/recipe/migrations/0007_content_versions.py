@@ -0,0 +1,38 @@
+# Generated by Django 3.2.15 on 2026-10-18 03:07
+
+from django.db import migrations, models
+
+
+def create_versions(apps, schema_editor):
+    ContentVersion = apps.get_model('recipe', 'ContentVersion')
+    for name in ('tag', 'ingredient'):
+        ContentVersion.objects.get_or_create(name=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0006_recipe_pub_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Справочник')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='Версия')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='дата изменения')),
+            ],
+            options={
+                'verbose_name': 'Версия справочника',
+                'verbose_name_plural': 'Версии справочников',
+            },
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='дата изменения'),
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
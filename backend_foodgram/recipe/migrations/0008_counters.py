@@ -0,0 +1,44 @@
+# Generated by Django 3.2.15 on 2026-10-18 03:11
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('recipe', 'Recipe', 'favorites_count', 'recipe', 'Favorite', 'recipe'),
+    ('recipe', 'Recipe', 'in_carts_count', 'recipe', 'ShoppingCart', 'recipe'),
+    ('user', 'User', 'recipes_count', 'recipe', 'Recipe', 'author'),
+    ('user', 'User', 'followers_count', 'user', 'Subscription', 'following'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for app, name, field, related_app, related_name, fk in COUNTERS:
+        related = apps.get_model(related_app, related_name)
+        actual = Coalesce(Subquery(
+            related.objects.filter(**{fk: OuterRef('pk')}).order_by()
+            .values(fk).annotate(total=Count('pk')).values('total')
+        ), 0)
+        apps.get_model(app, name).objects.update(**{field: actual})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0007_content_versions'),
+        ('user', '0005_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='в избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='в списках покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 3.2.15 on 2026-10-18 03:15
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+CREATE_INDEXES = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS recipe_search_vector_idx '
+    'ON recipe_recipe USING gin (search_vector)',
+    'CREATE INDEX IF NOT EXISTS recipe_name_trgm_idx '
+    'ON recipe_recipe USING gin (name gin_trgm_ops)',
+    """
+    UPDATE recipe_recipe AS recipe SET search_vector =
+        setweight(to_tsvector('russian', recipe.name), 'A')
+        || setweight(to_tsvector('russian', coalesce((
+            SELECT string_agg(tag.name, ' ')
+            FROM recipe_recipe_tags AS link
+            JOIN recipe_tag AS tag ON tag.id = link.tag_id
+            WHERE link.recipe_id = recipe.id
+        ), '')), 'B')
+        || setweight(to_tsvector('russian', coalesce((
+            SELECT string_agg(ingredient.name, ' ')
+            FROM recipe_ingredientrecipe AS link
+            JOIN recipe_ingredient AS ingredient
+                ON ingredient.id = link.ingredient_id
+            WHERE link.recipe_id = recipe.id
+        ), '')), 'B')
+        || setweight(to_tsvector('russian', recipe.text), 'C')
+    """,
+)
+DROP_INDEXES = (
+    'DROP INDEX IF EXISTS recipe_name_trgm_idx',
+    'DROP INDEX IF EXISTS recipe_search_vector_idx',
+)
+
+
+def run_on_postgres(statements):
+    """GIN-индексы и заполнение вектора есть только в PostgreSQL."""
+
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            for statement in statements:
+                schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0008_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='поисковый вектор'),
+        ),
+        migrations.RunPython(
+            run_on_postgres(CREATE_INDEXES), run_on_postgres(DROP_INDEXES)
+        ),
+    ]
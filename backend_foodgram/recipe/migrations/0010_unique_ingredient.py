@@ -0,0 +1,42 @@
+# Generated by Django 3.2.15 on 2026-10-18 03:20
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicates(apps, schema_editor):
+    """
+    Оставляет ингредиент с наименьшим id и переносит на него рецепты
+    дубликатов; если рецепт уже ссылается на оставленный ингредиент,
+    лишняя строка рецепта удаляется.
+    """
+    Ingredient = apps.get_model('recipe', 'Ingredient')
+    IngredientRecipe = apps.get_model('recipe', 'IngredientRecipe')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(total=Count('id'), keep=Min('id')).filter(total__gt=1)
+    for group in duplicates:
+        others = Ingredient.objects.filter(
+            name=group['name'], measurement_unit=group['measurement_unit']
+        ).exclude(id=group['keep'])
+        kept = IngredientRecipe.objects.filter(ingredient_id=group['keep'])
+        for other_id in others.values_list('id', flat=True):
+            links = IngredientRecipe.objects.filter(ingredient_id=other_id)
+            links.filter(recipe__in=kept.values('recipe')).delete()
+            links.update(ingredient_id=group['keep'])
+        others.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0009_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+    ]
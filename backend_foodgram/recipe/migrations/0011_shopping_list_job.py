@@ -0,0 +1,42 @@
+# Generated by Django 3.2.15 on 2026-10-18 03:27
+
+import uuid
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipe', '0010_unique_ingredient'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('format', models.CharField(max_length=50, verbose_name='Формат')),
+                ('cache_key', models.CharField(max_length=256, verbose_name='Ключ версии корзины')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Формируется'), ('done', 'Готов'), ('failed', 'Ошибка')], default='pending', max_length=7, verbose_name='Статус')),
+                ('lines', models.PositiveIntegerField(default=0, verbose_name='Строк')),
+                ('progress', models.PositiveSmallIntegerField(default=0, verbose_name='Готовность, %')),
+                ('file_name', models.CharField(blank=True, max_length=256, verbose_name='Файл')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создан')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершён')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Формирование списка покупок',
+                'verbose_name_plural': 'Формирование списков покупок',
+                'ordering': ('-created_at',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='shoppinglistjob',
+            index=models.Index(fields=['user', 'cache_key'], name='shopping_list_job_key_idx'),
+        ),
+    ]
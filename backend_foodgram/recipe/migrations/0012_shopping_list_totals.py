@@ -0,0 +1,52 @@
+# Generated by Django 3.2.15 on 2026-10-18 03:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def fill_totals(apps, schema_editor):
+    IngredientRecipe = apps.get_model('recipe', 'IngredientRecipe')
+    ShoppingListTotal = apps.get_model('recipe', 'ShoppingListTotal')
+    ShoppingListTotal.objects.bulk_create(
+        (
+            ShoppingListTotal(
+                user_id=user_id, ingredient_id=ingredient_id, total=total
+            )
+            for user_id, ingredient_id, total in IngredientRecipe.objects
+            .filter(recipe__shopping_cart__user__isnull=False)
+            .values_list('recipe__shopping_cart__user', 'ingredient')
+            .order_by().annotate(total=Sum('amount')).iterator()
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipe', '0011_shopping_list_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.IntegerField(verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_totals', to='recipe.ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_totals', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Итог списка покупок',
+                'verbose_name_plural': 'Итоги списков покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglisttotal',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_shopping_list_total'),
+        ),
+        migrations.RunPython(fill_totals, migrations.RunPython.noop),
+    ]
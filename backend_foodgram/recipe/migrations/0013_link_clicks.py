@@ -0,0 +1,31 @@
+# Generated by Django 3.2.15 on 2026-10-18 03:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0012_shopping_list_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LinkClick',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=256, verbose_name='Код ссылки')),
+                ('day', models.DateField(verbose_name='День')),
+                ('clicks', models.PositiveBigIntegerField(default=0, verbose_name='Переходов')),
+            ],
+            options={
+                'verbose_name': 'Переходы по ссылке',
+                'verbose_name_plural': 'Переходы по ссылкам',
+                'ordering': ('-day', '-clicks'),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='linkclick',
+            constraint=models.UniqueConstraint(fields=('code', 'day'), name='unique_link_click_day'),
+        ),
+    ]
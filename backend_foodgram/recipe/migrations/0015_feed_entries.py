@@ -0,0 +1,67 @@
+# Generated by Django 3.2.15 on 2026-10-18 03:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Значения api.constants на момент миграции.
+FEED_PUSH_FOLLOWERS_LIMIT = 1000
+FEED_BACKFILL_SIZE = 100
+
+
+def fill_feeds(apps, schema_editor):
+    FeedEntry = apps.get_model('recipe', 'FeedEntry')
+    Recipe = apps.get_model('recipe', 'Recipe')
+    Subscription = apps.get_model('user', 'Subscription')
+    subscriptions = Subscription.objects.filter(
+        following__followers_count__lt=FEED_PUSH_FOLLOWERS_LIMIT
+    ).values_list('follower', 'following')
+    for follower_id, author_id in subscriptions.iterator():
+        FeedEntry.objects.bulk_create(
+            FeedEntry(
+                user_id=follower_id,
+                recipe_id=recipe_id,
+                author_id=author_id,
+                pub_date=pub_date
+            )
+            for recipe_id, pub_date in Recipe.objects.filter(
+                author=author_id
+            ).order_by('-pub_date', '-id').values_list(
+                'id', 'pub_date'
+            )[:FEED_BACKFILL_SIZE]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipe', '0014_recipe_author_pub_date_idx'),
+        ('user', '0005_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='дата публикации')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='recipe.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи лент',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', '-pub_date', '-recipe'], name='feed_entry_user_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_feed_entry'),
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,11 @@
 import secrets
 import string
+import uuid
 
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.utils import timezone
 
 from api.constants import (
     HASH_LENGTH,
@@ -11,7 +14,7 @@ from api.constants import (
     MAX_VALUE,
     MIN_VALUE
 )
-from user.models import User
+from user.models import CounterFieldsMixin, User
 
 from .validators import validate_slug
 
@@ -49,12 +52,54 @@ class Ingredient(models.Model):
     class Meta:
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
+        constraints = (
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient'
+            ),
+        )
 
     def __str__(self):
         return self.name
 
 
-class Recipe(models.Model):
+class ContentVersion(models.Model):
+    """Счётчик изменений справочника для условных запросов и кэшей."""
+
+    TAG = 'tag'
+    INGREDIENT = 'ingredient'
+
+    name = models.CharField(
+        verbose_name='Справочник',
+        max_length=MAX_SLAG,
+        unique=True
+    )
+    version = models.PositiveBigIntegerField(
+        verbose_name='Версия',
+        default=0
+    )
+    updated_at = models.DateTimeField(
+        verbose_name='дата изменения',
+        auto_now=True
+    )
+
+    class Meta:
+        verbose_name = 'Версия справочника'
+        verbose_name_plural = 'Версии справочников'
+
+    def __str__(self):
+        return f'{self.name} v{self.version}'
+
+    @classmethod
+    def bump(cls, name):
+        updated = cls.objects.filter(name=name).update(
+            version=models.F('version') + 1, updated_at=timezone.now()
+        )
+        if not updated:
+            cls.objects.get_or_create(name=name, defaults={'version': 1})
+
+
+class Recipe(CounterFieldsMixin, models.Model):
     tags = models.ManyToManyField(
         Tag,
         verbose_name='Тег'
@@ -99,12 +144,43 @@ class Recipe(models.Model):
         verbose_name='дата публикации',
         db_index=True
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='дата изменения'
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='в избранном'
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='в списках покупок'
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='поисковый вектор'
+    )
+
+    counter_fields = ('favorites_count', 'in_carts_count')
 
     class Meta:
         default_related_name = 'recipes'
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date'),
+                name='recipe_author_pub_date_idx'
+            ),
+        )
 
     def __str__(self):
         return self.name
@@ -206,6 +282,149 @@ class ShoppingCart(models.Model):
         return f'{self.recipe} в списке покупок у {self.user}'
 
 
+class FeedEntry(models.Model):
+    """
+    Рецепт в ленте подписчика. Записи создаются при публикации рецепта
+    для подписчиков не слишком популярных авторов; pub_date и автор
+    продублированы из рецепта, чтобы лента читалась по одному индексу.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    pub_date = models.DateTimeField(verbose_name='дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи лент'
+        constraints = (
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-recipe'),
+                name='feed_entry_user_pub_date_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.recipe} в ленте {self.user}'
+
+
+class ShoppingListTotal(models.Model):
+    """
+    Суммарное количество ингредиента в корзине пользователя.
+    Поддерживается приращениями при изменении корзины и рецептов в ней.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_totals',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_totals',
+        verbose_name='Ингредиент'
+    )
+    total = models.IntegerField(verbose_name='Количество')
+
+    class Meta:
+        verbose_name = 'Итог списка покупок'
+        verbose_name_plural = 'Итоги списков покупок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_total'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.ingredient}: {self.total} у {self.user}'
+
+
+class ShoppingListJob(models.Model):
+    """Фоновое формирование списка покупок."""
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'В очереди'
+        RUNNING = 'running', 'Формируется'
+        DONE = 'done', 'Готов'
+        FAILED = 'failed', 'Ошибка'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_jobs',
+        verbose_name='Пользователь'
+    )
+    format = models.CharField(verbose_name='Формат', max_length=MAX_SLAG)
+    cache_key = models.CharField(
+        verbose_name='Ключ версии корзины',
+        max_length=MAX_LENGTH
+    )
+    status = models.CharField(
+        verbose_name='Статус',
+        max_length=max(len(status) for status, _ in Status.choices),
+        choices=Status.choices,
+        default=Status.PENDING
+    )
+    lines = models.PositiveIntegerField(verbose_name='Строк', default=0)
+    progress = models.PositiveSmallIntegerField(
+        verbose_name='Готовность, %',
+        default=0
+    )
+    file_name = models.CharField(
+        verbose_name='Файл',
+        max_length=MAX_LENGTH,
+        blank=True
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Создан',
+        auto_now_add=True
+    )
+    finished_at = models.DateTimeField(
+        verbose_name='Завершён',
+        null=True,
+        blank=True
+    )
+
+    class Meta:
+        verbose_name = 'Формирование списка покупок'
+        verbose_name_plural = 'Формирование списков покупок'
+        ordering = ('-created_at',)
+        indexes = (
+            models.Index(
+                fields=('user', 'cache_key'),
+                name='shopping_list_job_key_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'Список покупок {self.user} ({self.get_status_display()})'
+
+
 class LinkMapped(models.Model):
     def generate_hash():
         length = HASH_LENGTH
@@ -223,3 +442,28 @@ class LinkMapped(models.Model):
 
     def __str__(self):
         return f'{self.original_url} -> {self.url_hash}'
+
+
+class LinkClick(models.Model):
+    """Переходы по короткой ссылке за день."""
+
+    code = models.CharField(verbose_name='Код ссылки', max_length=MAX_LENGTH)
+    day = models.DateField(verbose_name='День')
+    clicks = models.PositiveBigIntegerField(
+        verbose_name='Переходов',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Переходы по ссылке'
+        verbose_name_plural = 'Переходы по ссылкам'
+        ordering = ('-day', '-clicks')
+        constraints = (
+            models.UniqueConstraint(
+                fields=['code', 'day'],
+                name='unique_link_click_day'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.code} {self.day}: {self.clicks}'
@@ -0,0 +1,27 @@
+from .snapshot import reference_data
+
+
+class TagRegistry:
+    """
+    Словарь «slug → id» тегов из общего снимка справочников.
+    Неизвестный slug вызывает внеочередную сверку снимка с базой,
+    чтобы только что созданный тег находился сразу.
+    """
+
+    def get_slugs(self):
+        return reference_data.get().tag_slugs
+
+    def get_id(self, slug):
+        tag_id = self.get_slugs().get(slug)
+        if tag_id is None:
+            tag_id = reference_data.refresh().tag_slugs.get(slug)
+        return tag_id
+
+    def get_ids(self, slugs):
+        return {tag_id for tag_id in map(self.get_id, slugs) if tag_id}
+
+    def choices(self):
+        return [(slug, slug) for slug in sorted(self.get_slugs())]
+
+
+tag_registry = TagRegistry()
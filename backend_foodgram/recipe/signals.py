@@ -0,0 +1,144 @@
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_save
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from api.constants import AUTHOR_FIELDS
+from user.models import Subscription, User
+
+from .counters import COUNTERS, change_counter
+from .feed import followed, unfollowed
+from .models import (
+    ContentVersion,
+    Ingredient,
+    IngredientRecipe,
+    Recipe,
+    ShoppingCart,
+    Tag
+)
+from .snapshot import reference_data
+from .totals import (
+    change_cart_totals,
+    change_ingredient_row,
+    ingredient_row,
+    saved_ingredient_row
+)
+
+
+def touch_recipes(recipe_ids):
+    """Отмечает рецепты изменёнными, когда меняются их связанные данные."""
+    Recipe.objects.filter(pk__in=recipe_ids).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, **kwargs):
+    ContentVersion.bump(ContentVersion.TAG)
+    reference_data.invalidate()
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    ContentVersion.bump(ContentVersion.INGREDIENT)
+    reference_data.invalidate()
+
+
+@receiver(post_save, sender=IngredientRecipe)
+@receiver(post_delete, sender=IngredientRecipe)
+def recipe_ingredients_changed(sender, instance, **kwargs):
+    touch_recipes((instance.recipe_id,))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        touch_recipes((instance.pk,))
+    elif pk_set is not None:
+        touch_recipes(pk_set)
+    else:
+        touch_recipes(instance.recipes.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    if created or (update_fields and AUTHOR_FIELDS.isdisjoint(update_fields)):
+        return
+    touch_recipes(instance.recipes.values_list('pk', flat=True))
+
+
+# Итоги списков покупок поддерживаются по обеим сторонам: строкам
+# корзины и строкам рецептов. Оба удаления обрабатываются в post_delete
+# с учётом того, что ещё осталось, поэтому при каскадном удалении
+# рецепта вклад не вычитается дважды, в каком бы порядке ни удалялись
+# корзины и ингредиенты.
+@receiver(post_save, sender=ShoppingCart)
+def cart_recipe_added(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_cart_totals(instance.user_id, instance.recipe_id, 1)
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def cart_recipe_removed(sender, instance, **kwargs):
+    change_cart_totals(instance.user_id, instance.recipe_id, -1)
+
+
+@receiver(pre_save, sender=IngredientRecipe)
+def recipe_ingredient_saving(sender, instance, raw=False, **kwargs):
+    instance._saved_row = None if raw else saved_ingredient_row(instance)
+
+
+@receiver(post_save, sender=IngredientRecipe)
+def recipe_ingredient_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        change_ingredient_row(instance._saved_row, ingredient_row(instance))
+
+
+@receiver(post_delete, sender=IngredientRecipe)
+def recipe_ingredient_deleted(sender, instance, **kwargs):
+    change_ingredient_row(ingredient_row(instance), None)
+
+
+def connect_counter(model, field, sender, related_field):
+    """
+    Поддерживает счётчик field модели model по строкам sender.
+    post_delete отправляется и для удалений через QuerySet.delete()
+    и каскадом, поэтому счётчик не расходится и в этих случаях.
+    """
+
+    def created(instance, created, raw=False, **kwargs):
+        if created and not raw:
+            change_counter(
+                model, getattr(instance, f'{related_field}_id'), field, 1
+            )
+
+    def deleted(instance, **kwargs):
+        change_counter(
+            model, getattr(instance, f'{related_field}_id'), field, -1
+        )
+
+    post_save.connect(created, sender=sender, weak=False)
+    post_delete.connect(deleted, sender=sender, weak=False)
+
+
+for counter in COUNTERS:
+    connect_counter(*counter)
+
+
+# Подключаются после счётчиков: ленте нужно уже обновлённое
+# число подписчиков автора.
+@receiver(post_save, sender=Subscription)
+def subscription_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        followed(instance)
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(sender, instance, **kwargs):
+    unfollowed(instance)
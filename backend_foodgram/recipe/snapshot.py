@@ -0,0 +1,244 @@
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import transaction
+
+from api.constants import REFERENCE_SNAPSHOT_TTL
+
+from .models import ContentVersion, Ingredient, Tag
+
+MAGIC = b'FGRD'
+FORMAT_VERSION = 1
+# Сигнатура, версии и время изменения справочников, число тегов
+# и ингредиентов, размер таблицы строк.
+HEADER = struct.Struct('<4sHQdQdIII')
+KINDS = (
+    (ContentVersion.TAG, Tag, ('name', 'slug')),
+    (ContentVersion.INGREDIENT, Ingredient, ('name', 'measurement_unit')),
+)
+SECTIONS = {model: name for name, model, _ in KINDS}
+
+
+def record_struct(fields):
+    """id, затем смещение и длина каждой строки в таблице строк."""
+    return struct.Struct('<Q' + 'IH' * len(fields))
+
+
+def to_timestamp(value):
+    return value.timestamp() if value else 0.0
+
+
+def to_datetime(timestamp):
+    if not timestamp:
+        return None
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+def write_snapshot(path):
+    """
+    Записывает снимок тегов и ингредиентов из базы. Файл заменяется
+    атомарно, поэтому процессы, уже открывшие прежний снимок, дочитывают
+    его без ошибок.
+    """
+    versions = dict.fromkeys((name for name, _, _ in KINDS), (0, None))
+    versions.update(
+        (name, (version, updated_at))
+        for name, version, updated_at in ContentVersion.objects.filter(
+            name__in=versions
+        ).values_list('name', 'version', 'updated_at')
+    )
+    strings = bytearray()
+    offsets = {}
+    sections = []
+    for _, model, fields in KINDS:
+        packer = record_struct(fields)
+        rows = model.objects.order_by('pk').values_list('pk', *fields)
+        records = bytearray()
+        count = 0
+        for pk, *values in rows.iterator():
+            parts = []
+            for value in values:
+                encoded = value.encode()
+                if encoded not in offsets:
+                    offsets[encoded] = len(strings)
+                    strings += encoded
+                parts += (offsets[encoded], len(encoded))
+            records += packer.pack(pk, *parts)
+            count += 1
+        sections.append((count, records))
+    (tag_version, tag_updated), (ingredient_version, ingredient_updated) = (
+        versions[name] for name, _, _ in KINDS
+    )
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION,
+        tag_version, to_timestamp(tag_updated),
+        ingredient_version, to_timestamp(ingredient_updated),
+        sections[0][0], sections[1][0], len(strings)
+    )
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(header)
+        for _, records in sections:
+            file.write(records)
+        file.write(strings)
+    os.replace(temporary, path)
+
+
+class Snapshot:
+    """
+    Снимок, отображённый в память только для чтения. Страницы файла
+    общие для всех процессов, а записи отсортированы по id, так что
+    поиск по id — двоичный поиск прямо по отображению.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self.buffer = mmap.mmap(
+                file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        (magic, format_version,
+         tag_version, tag_updated, ingredient_version, ingredient_updated,
+         tag_count, ingredient_count, strings_size) = HEADER.unpack_from(
+            self.buffer
+        )
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise ValueError('Неизвестный формат снимка справочников')
+        self.versions = {
+            ContentVersion.TAG: (tag_version, to_datetime(tag_updated)),
+            ContentVersion.INGREDIENT: (
+                ingredient_version, to_datetime(ingredient_updated)
+            ),
+        }
+        self.sections = {}
+        offset = HEADER.size
+        for (name, _, fields), count in zip(
+            KINDS, (tag_count, ingredient_count)
+        ):
+            packer = record_struct(fields)
+            self.sections[name] = (offset, count, packer, fields)
+            offset += count * packer.size
+        self.strings = offset
+        if len(self.buffer) != offset + strings_size:
+            raise ValueError('Снимок справочников повреждён')
+        self._tag_slugs = None
+
+    def read(self, name, index):
+        offset, _, packer, fields = self.sections[name]
+        pk, *parts = packer.unpack_from(
+            self.buffer, offset + index * packer.size
+        )
+        item = {'id': pk}
+        for field, start, length in zip(fields, parts[::2], parts[1::2]):
+            start += self.strings
+            item[field] = self.buffer[start:start + length].decode()
+        return item
+
+    def get(self, name, pk):
+        offset, count, packer, _ = self.sections[name]
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            (middle_pk,) = struct.unpack_from(
+                '<Q', self.buffer, offset + middle * packer.size
+            )
+            if middle_pk < pk:
+                low = middle + 1
+            elif middle_pk > pk:
+                high = middle
+            else:
+                return self.read(name, middle)
+        return None
+
+    def all(self, name):
+        _, count, _, _ = self.sections[name]
+        return [self.read(name, index) for index in range(count)]
+
+    def tag(self, pk):
+        return self.get(ContentVersion.TAG, pk)
+
+    def ingredient(self, pk):
+        return self.get(ContentVersion.INGREDIENT, pk)
+
+    def tags(self):
+        return self.all(ContentVersion.TAG)
+
+    def ingredients(self):
+        return self.all(ContentVersion.INGREDIENT)
+
+    @property
+    def tag_slugs(self):
+        if self._tag_slugs is None:
+            self._tag_slugs = {tag['slug']: tag['id'] for tag in self.tags()}
+        return self._tag_slugs
+
+
+class ReferenceData:
+    """
+    Общий для процессов снимок тегов и ингредиентов.
+
+    Процесс сверяет версии справочников в базе со снимком не чаще раза
+    в ttl секунд (и сразу после изменения справочника в этом процессе).
+    Если версии разошлись, он берёт файл, уже записанный другим
+    процессом, или записывает новый.
+    """
+
+    names = tuple(name for name, _, _ in KINDS)
+
+    def __init__(self, path=None, ttl=REFERENCE_SNAPSHOT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.checked_at = 0
+
+    def get_path(self):
+        return self.path or settings.REFERENCE_SNAPSHOT_PATH
+
+    def get(self):
+        if (self.snapshot is None
+                or time.monotonic() - self.checked_at > self.ttl):
+            self.refresh()
+        return self.snapshot
+
+    def refresh(self):
+        with self.lock:
+            versions = dict(ContentVersion.objects.filter(
+                name__in=self.names
+            ).values_list('name', 'version'))
+            if self.snapshot is None or not self.matches(
+                self.snapshot, versions
+            ):
+                self.snapshot = self.load(versions)
+            self.checked_at = time.monotonic()
+        return self.snapshot
+
+    def matches(self, snapshot, versions):
+        return all(
+            snapshot.versions[name][0] == versions.get(name, 0)
+            for name in self.names
+        )
+
+    def load(self, versions):
+        path = self.get_path()
+        try:
+            snapshot = Snapshot(path)
+        except (OSError, ValueError):
+            snapshot = None
+        if snapshot is None or not self.matches(snapshot, versions):
+            write_snapshot(path)
+            snapshot = Snapshot(path)
+        return snapshot
+
+    def invalidate(self):
+        transaction.on_commit(self.expire)
+
+    def expire(self):
+        self.checked_at = 0
+
+
+reference_data = ReferenceData()
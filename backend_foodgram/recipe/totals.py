@@ -0,0 +1,105 @@
+from django.db import connection
+from django.db.models import Sum
+
+from .models import IngredientRecipe, ShoppingCart, ShoppingListTotal
+
+TABLE = ShoppingListTotal._meta.db_table
+UPSERT = (
+    f'INSERT INTO {TABLE} (user_id, ingredient_id, total) {{select}} '
+    'ON CONFLICT (user_id, ingredient_id) DO UPDATE '
+    f'SET total = {TABLE}.total + excluded.total'
+)
+# Приращение от рецепта в корзине одного пользователя.
+ADD_RECIPE = UPSERT.format(select=(
+    'SELECT %s, ingredient_id, %s * amount '
+    f'FROM {IngredientRecipe._meta.db_table} WHERE recipe_id = %s'
+))
+# Приращение одного ингредиента у всех, у кого рецепт в корзине.
+CHANGE_INGREDIENT = UPSERT.format(select=(
+    'SELECT user_id, %s, %s '
+    f'FROM {ShoppingCart._meta.db_table} WHERE recipe_id = %s'
+))
+
+
+def change_cart_totals(user_id, recipe_id, sign):
+    """Добавляет рецепт в итоги пользователя (sign=1) или вычитает (-1)."""
+    with connection.cursor() as cursor:
+        cursor.execute(ADD_RECIPE, (user_id, sign, recipe_id))
+    if sign < 0:
+        ShoppingListTotal.objects.filter(user=user_id, total__lte=0).delete()
+
+
+def change_recipe_totals(recipe_id, old, new):
+    """
+    Применяет изменение ингредиентов рецепта к итогам всех,
+    у кого он в корзине. old и new — {id ингредиента: количество}.
+    """
+    deltas = {
+        ingredient: new.get(ingredient, 0) - old.get(ingredient, 0)
+        for ingredient in old.keys() | new.keys()
+    }
+    params = [
+        (ingredient, delta, recipe_id)
+        for ingredient, delta in deltas.items() if delta
+    ]
+    if not params:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(CHANGE_INGREDIENT, params)
+    ShoppingListTotal.objects.filter(
+        user__in=ShoppingCart.objects.filter(recipe=recipe_id).values('user'),
+        ingredient__in=[
+            ingredient for ingredient, delta in deltas.items() if delta < 0
+        ],
+        total__lte=0
+    ).delete()
+
+
+def ingredient_row(instance):
+    return instance.recipe_id, instance.ingredient_id, instance.amount
+
+
+def saved_ingredient_row(instance):
+    """Строка рецепта, как она записана в базе, или None для новой."""
+    if instance._state.adding:
+        return None
+    return IngredientRecipe.objects.filter(pk=instance.pk).values_list(
+        'recipe', 'ingredient', 'amount'
+    ).first()
+
+
+def change_ingredient_row(old, new):
+    """
+    Применяет к итогам замену строки рецепта old на new: кортежей
+    (рецепт, ингредиент, количество) или None для добавления и удаления.
+    """
+    changes = {}
+    for row, index in ((old, 0), (new, 1)):
+        if row is not None:
+            recipe_id, ingredient_id, amount = row
+            changes.setdefault(recipe_id, ({}, {}))[index][
+                ingredient_id
+            ] = amount
+    for recipe_id, (old_amounts, new_amounts) in changes.items():
+        change_recipe_totals(recipe_id, old_amounts, new_amounts)
+
+
+def expected_totals(user_ids):
+    """Итоги, посчитанные заново по корзинам: {(user, ingredient): total}."""
+    return {
+        (user_id, ingredient_id): total
+        for user_id, ingredient_id, total in IngredientRecipe.objects.filter(
+            recipe__shopping_cart__user__in=user_ids
+        ).values_list(
+            'recipe__shopping_cart__user', 'ingredient'
+        ).order_by().annotate(total=Sum('amount'))
+    }
+
+
+def stored_totals(user_ids):
+    return {
+        (user_id, ingredient_id): total
+        for user_id, ingredient_id, total in ShoppingListTotal.objects.filter(
+            user__in=user_ids
+        ).values_list('user', 'ingredient', 'total')
+    }
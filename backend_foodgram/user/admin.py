@@ -10,20 +10,12 @@ from .models import User
 class UsersAdmin(UserAdmin):
     """Админка для пользователя"""
 
-    list_display = ('id', 'username', 'email', 'role', 'subscribers_count',
+    list_display = ('id', 'username', 'email', 'role', 'followers_count',
                     'recipes_count')
     search_fields = ('username', 'email')
     search_help_text = 'Поиск по `username` и `email`'
     list_display_links = ('id', 'username', 'email')
 
-    @admin.display(description='Подписчики')
-    def subscribers_count(self, obj):
-        return obj.following.count()
-
-    @admin.display(description='Рецепты')
-    def recipes_count(self, obj):
-        return obj.recipes.count()
-
 
 admin.site.unregister(Group)
 admin.site.unregister(TokenProxy)
@@ -13,7 +13,32 @@ from api.constants import (
 from .validators import UsernameValidator, validate_username
 
 
-class User(AbstractUser):
+class CounterFieldsMixin:
+    """
+    Счётчики меняются только UPDATE с F() (recipe.counters), поэтому
+    обычное сохранение загруженного объекта их не записывает и не
+    затирает значениями, прочитанными раньше.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+            and not self._state.adding
+        ):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(CounterFieldsMixin, AbstractUser):
     """Расширенная стандартная Django модель"""
 
     class Role(models.TextChoices):
@@ -63,6 +88,18 @@ class User(AbstractUser):
         verbose_name='пароль'
     )
     avatar = models.ImageField(upload_to='avatars/', null=True, blank=True)
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Рецепты'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Подписчики'
+    )
+
+    counter_fields = ('recipes_count', 'followers_count')
 
     @property
     def is_admin(self):
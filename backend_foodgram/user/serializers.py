@@ -11,11 +11,12 @@ from rest_framework.serializers import (
     SerializerMethodField,
     ValidationError
 )
-from rest_framework.validators import UniqueTogetherValidator
 
+from api.constants import SUBSCRIPTION_RECIPES_LIMIT
+from api.fieldsets import SparseFieldsetMixin
 from recipe.models import Recipe
 
-from .models import Subscription, User
+from .models import User
 
 
 class Base64ImageField(ImageField):
@@ -77,7 +78,7 @@ class UserCreateSerializer(UserCreateSerializer):
         return serializer.data
 
 
-class UserSerializer(UserSerializer):
+class UserSerializer(SparseFieldsetMixin, UserSerializer):
     is_subscribed = SerializerMethodField(read_only=True)
 
     class Meta:
@@ -96,6 +97,8 @@ class UserSerializer(UserSerializer):
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
+        if hasattr(object, 'is_subscribed'):
+            return object.is_subscribed
         return object.following.filter(follower=request.user).exists()
 
 
@@ -107,6 +110,17 @@ class AvatarSerializer(ModelSerializer):
         fields = ('avatar',)
 
 
+def get_recipes_limit(request):
+    """recipes_limit из запроса, ограниченный 0..SUBSCRIPTION_RECIPES_LIMIT."""
+    if request is None:
+        return SUBSCRIPTION_RECIPES_LIMIT
+    try:
+        limit = int(request.query_params['recipes_limit'])
+    except (KeyError, ValueError):
+        return SUBSCRIPTION_RECIPES_LIMIT
+    return max(0, min(limit, SUBSCRIPTION_RECIPES_LIMIT))
+
+
 class SubscriptionRecipeShortSerializer(ModelSerializer):
 
     class Meta:
@@ -122,7 +136,7 @@ class SubscriptionRecipeShortSerializer(ModelSerializer):
 class SubscriptionShowSerializer(UserSerializer):
 
     recipes = SerializerMethodField()
-    recipes_count = ReadOnlyField(source='recipes.count')
+    recipes_count = ReadOnlyField()
 
     class Meta:
         model = User
@@ -139,37 +153,11 @@ class SubscriptionShowSerializer(UserSerializer):
         )
 
     def get_recipes(self, object):
-        recipes_limit = self.context.get('request').query_params.get(
-            'recipes_limit', None)
-        author_recipes = object.recipes.all()
-        if recipes_limit is not None:
-            author_recipes = object.recipes.all()[:int(recipes_limit)]
+        author_recipes = getattr(object, 'recent_recipes', None)
+        if author_recipes is None:
+            author_recipes = object.recipes.only(
+                *SubscriptionRecipeShortSerializer.Meta.fields
+            )[:get_recipes_limit(self.context.get('request'))]
         return SubscriptionRecipeShortSerializer(
             author_recipes, many=True
         ).data
-
-
-class SubscriptionSerializer(ModelSerializer):
-
-    class Meta:
-        model = Subscription
-        fields = '__all__'
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Subscription.objects.all(),
-                fields=('follower', 'following'),
-                message='Вы уже подписывались на этого автора'
-            )
-        ]
-
-    def validate(self, data):
-        """Проверяем, что пользователь не подписывается на самого себя."""
-        if data['following'] == data['follower']:
-            raise ValidationError(
-                'Подписка на cамого себя не имеет смысла'
-            )
-        return data
-
-    def to_representation(self, instance):
-        return SubscriptionShowSerializer(instance.author,
-                                          context=self.context).data
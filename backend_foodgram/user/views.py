@@ -1,11 +1,13 @@
+from django.db.models import Exists, OuterRef
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from rest_framework.decorators import action
-from rest_framework.exceptions import ParseError
+from rest_framework.exceptions import ParseError, ValidationError
 from rest_framework.filters import SearchFilter
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.status import (
     HTTP_200_OK,
     HTTP_201_CREATED,
@@ -13,25 +15,37 @@ from rest_framework.status import (
     HTTP_400_BAD_REQUEST
 )
 
-from api.constants import PER_PAGE
+from api.constants import PER_PAGE, SELF_SUBSCRIPTION, SUBSCRIPTION_EXISTS
+from api.fieldsets import SparseFieldsetViewMixin
+from api.optimizers import OptimizedQuerysetMixin, prefetch_recent
+from api.pagination import CursorOptInMixin, KeysetPagination
+from api.utils import delete_existing, insert_unique
+from recipe.models import Recipe
 
 from .models import Subscription, User
 from .serializers import (
     AvatarSerializer,
-    SubscriptionSerializer,
+    SubscriptionRecipeShortSerializer,
     SubscriptionShowSerializer,
-    UserSerializer
+    UserSerializer,
+    get_recipes_limit
 )
 
 
-class FoodgramPagination(PageNumberPagination):
+class UserKeysetPagination(KeysetPagination):
+    ordering = ('id',)
+
+
+class FoodgramPagination(CursorOptInMixin, PageNumberPagination):
     """Пагинация для проекта"""
 
     page_size = PER_PAGE
     page_size_query_param = 'limit'
+    cursor_pagination_class = UserKeysetPagination
 
 
-class UserViewSet(UserViewSet):
+class UserViewSet(OptimizedQuerysetMixin, SparseFieldsetViewMixin,
+                  UserViewSet):
     serializer_class = UserSerializer
     queryset = User.objects.all()
     permission_classes = (AllowAny,)
@@ -41,6 +55,29 @@ class UserViewSet(UserViewSet):
     search_fields = ('username',)
     http_method_names = ('get', 'post', 'put', 'delete')
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset
+        return queryset.annotate(
+            is_subscribed=Exists(Subscription.objects.filter(
+                follower=user, following=OuterRef('pk')))
+        )
+
+    def get_current_user(self):
+        """
+        Текущий пользователь из базы для записи: request.user может быть
+        копией из кэша аутентификации, и её сохранение вернуло бы
+        в базу устаревшие поля.
+        """
+        return User.objects.get(pk=self.request.user.pk)
+
+    def get_serializer_class(self):
+        if self.action == 'subscriptions':
+            return SubscriptionShowSerializer
+        return super().get_serializer_class()
+
     @action(
         detail=False,
         methods=('patch',),
@@ -51,7 +88,7 @@ class UserViewSet(UserViewSet):
     def me(self, request):
 
         serializer = UserSerializer(
-            request.user, data=request.data,
+            self.get_current_user(), data=request.data,
             partial=True, context={'request': request}
         )
         serializer.is_valid(raise_exception=True)
@@ -74,10 +111,16 @@ class UserViewSet(UserViewSet):
     )
     def subscribe(self, request, id):
         author = get_object_or_404(User, id=id)
-        serializer = SubscriptionSerializer(data={
-            'follower': request.user.id, 'following': author.id})
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
+        if author == request.user:
+            raise ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [SELF_SUBSCRIPTION]}
+            )
+        if not insert_unique(
+            Subscription, follower_id=request.user.id, following_id=author.id
+        ):
+            raise ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [SUBSCRIPTION_EXISTS]}
+            )
         author_serializer = SubscriptionShowSerializer(
             author,
             context={'request': request}
@@ -86,14 +129,12 @@ class UserViewSet(UserViewSet):
 
     @subscribe.mapping.delete
     def delete_subscribe(self, request, id):
-        author = get_object_or_404(User, id=id)
-        try:
-            subscription = Subscription.objects.get(follower=request.user,
-                                                    following=author)
-            subscription.delete()
-            return Response(status=HTTP_204_NO_CONTENT)
-        except Subscription.DoesNotExist:
+        if not delete_existing(
+            Subscription, follower_id=request.user.id, following_id=id
+        ):
+            get_object_or_404(User, id=id)
             raise ParseError('Объект не найден')
+        return Response(status=HTTP_204_NO_CONTENT)
 
     @action(
         detail=False,
@@ -103,15 +144,19 @@ class UserViewSet(UserViewSet):
         permission_classes=(IsAuthenticated,)
     )
     def subscriptions(self, request):
-        authors = User.objects.filter(following__follower=request.user)
-        paginator = FoodgramPagination()
-        result_pages = paginator.paginate_queryset(
-            queryset=authors, request=request
-        )
-        serializer = SubscriptionShowSerializer(
-            result_pages, context={'request': request}, many=True
+        authors = self.get_queryset().filter(following__follower=request.user)
+        result_pages = self.paginate_queryset(authors)
+        prefetch_recent(
+            result_pages,
+            Recipe.objects.only(
+                *SubscriptionRecipeShortSerializer.Meta.fields
+            ),
+            'author',
+            get_recipes_limit(request),
+            'recent_recipes'
         )
-        return paginator.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(result_pages, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(
         detail=False,
@@ -120,9 +165,9 @@ class UserViewSet(UserViewSet):
         permission_classes=(IsAuthenticated,)
     )
     def update_avatar(self, request):
-        user = request.user
+        user = self.get_current_user()
         user.avatar = None
-        user.save()
+        user.save(update_fields=('avatar',))
         return Response(status=HTTP_204_NO_CONTENT)
 
     @update_avatar.mapping.put
@@ -130,7 +175,7 @@ class UserViewSet(UserViewSet):
         if 'avatar' not in request.data:
             return Response({'detail': 'Поле аватар обязательно.'},
                             status=HTTP_400_BAD_REQUEST)
-        serializer = AvatarSerializer(request.user,
+        serializer = AvatarSerializer(self.get_current_user(),
                                       data=request.data,
                                       partial=True)
         serializer.is_valid(raise_exception=True)